@@ -0,0 +1,65 @@
+import sys
+import os
+import argparse
+import time
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.batch_inspector import BatchInspector
+from src.core.database import DatabaseManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch inspection of a folder of test images.")
+    parser.add_argument("reference", help="Reference (golden sample) image")
+    parser.add_argument("tests", help="Directory or glob pattern of test images")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--align-scale", type=float, default=1.0,
+                        help="Match features on a downscaled image (e.g. 0.25), then refine at full resolution")
+    parser.add_argument("--matcher", choices=["bf", "flann"], default="bf",
+                        help="Feature matcher: cross-checked brute force or FLANN LSH with ratio test")
+    parser.add_argument("--reuse-pose", action="store_true",
+                        help="Fixtured boards: reuse the previous homography while it still validates")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Detect defects tile by tile (e.g. 2048) to bound memory on very large panels")
+    parser.add_argument("--recipe", default=None,
+                        help="Recipe file or name in data/recipes (default: <reference>.recipe.json or built-in)")
+    parser.add_argument("--no-db", action="store_true", help="Do not log results to the database")
+    args = parser.parse_args()
+
+    db = None if args.no_db else DatabaseManager()
+    inspector = BatchInspector(db=db, max_workers=args.workers,
+                               processor_options={"align_scale": args.align_scale, "matcher": args.matcher,
+                                                  "reuse_homography": args.reuse_pose},
+                               tile_size=args.tile_size, recipe=args.recipe)
+
+    start = time.perf_counter()
+    results = inspector.run(args.reference, args.tests)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if r["error"]:
+            print(f"{r['filename']}: ERROR {r['error']}")
+        else:
+            status = "PASS" if r["defect_count"] == 0 else "FAIL"
+            print(f"{r['filename']}: {status} ({r['defect_count']} defects)")
+
+    if results:
+        print(f"Inspected {len(results)} images in {elapsed:.2f}s ({len(results) / elapsed:.1f} img/s)")
+
+        # Mean time per stage (per image, inside the workers)
+        timings = [r["metrics"]["timings"] for r in results if r["metrics"]]
+        if timings:
+            stages = {stage: sum(t.get(stage, 0.0) for t in timings) / len(timings) for stage in timings[0]}
+            print("Stage means: " + " | ".join(f"{stage} {ms:.1f} ms" for stage, ms in stages.items()))
+    else:
+        print("No test images found.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import sys
+import os
+import argparse
+import contextlib
+import io
+import json
+import glob
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+import cv2
+import numpy as np
+
+from src.core.image_processor import ImageProcessor, fill_holes, contour_points, measure_blobs
+from src.core.feature_cache import keypoint_points
+from src.core.defects import defects_to_records, render_defects
+from src.core.database import DatabaseManager
+from src.core.reference_store import ReferenceStore
+
+IMAGE_DIR = os.path.join(root_dir, "data", "images")
+DEFAULT_BASELINE = os.path.join(root_dir, "data", "benchmarks", "pipeline_baseline.json")
+
+STAGES = ["decode", "gray", "ref_features", "orb", "match", "ransac", "warp",
+          "diff", "blobs", "render", "db"]
+
+
+class StageTimer:
+    """Collects wall-clock samples per stage name."""
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def merge(self, other):
+        for stage, samples in other.samples.items():
+            self.samples.setdefault(stage, []).extend(samples)
+
+
+def sample_pairs(max_pairs):
+    """(reference, test) path pairs from the bundled sample boards."""
+    refs = sorted(glob.glob(os.path.join(IMAGE_DIR, "reference", "*.jpg")))
+    tests = sorted(glob.glob(os.path.join(IMAGE_DIR, "test", "*.jpg")))
+    pairs = [(ref, test) for ref in refs for test in tests]
+    return pairs[:max_pairs] if max_pairs else pairs
+
+
+def synthesize(pairs, scale, density, out_dir, seed=0):
+    """
+    Writes upscaled copies of the pairs (with extra synthetic defects) as JPEGs.
+
+    Args:
+        scale (float): Upscaling factor (2 = twice the width and height).
+        density (float): Extra defects per megapixel drawn onto each test image.
+    """
+    rng = np.random.default_rng(seed)
+    written, refs = [], {}
+    for ref_path, test_path in pairs:
+        if ref_path not in refs:
+            img = cv2.imread(ref_path)
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            refs[ref_path] = os.path.join(out_dir, f"ref_{len(refs)}.jpg")
+            cv2.imwrite(refs[ref_path], img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+        img = cv2.imread(test_path)
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        h, w = img.shape[:2]
+        for _ in range(int(round(density * w * h / 1e6))):
+            x, y = int(rng.integers(0, w)), int(rng.integers(0, h))
+            radius = int(rng.integers(3, 12) * scale)
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.circle(img, (x, y), radius, color, -1)
+
+        path = os.path.join(out_dir, f"test_{len(written)}.jpg")
+        cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        written.append((refs[ref_path], path))
+    return written
+
+
+def run_stages(processor, db, ref_path, test_path, timer):
+    """
+    One inspection, stage by stage (default settings: full-resolution matching).
+
+    Returns the defect count, or None when registration fails (no descriptors,
+    fewer than 4 matches or no homography), like align_images.
+    """
+    img_ref = timer.time("decode", cv2.imread, ref_path)
+    img_test = timer.time("decode", cv2.imread, test_path)
+
+    gray_test = timer.time("gray", cv2.cvtColor, img_test, cv2.COLOR_BGR2GRAY)
+    gray_ref = timer.time("gray", cv2.cvtColor, img_ref, cv2.COLOR_BGR2GRAY)
+
+    ref_feats = timer.time("ref_features", processor.get_reference_features, img_ref, ref_path)
+    kp, des = timer.time("orb", processor.orb.detectAndCompute, gray_test, None)
+    if des is None or ref_feats.descriptors is None:
+        return None
+    query_idx, train_idx = timer.time("match", processor.matcher.match, des, ref_feats)
+    if len(query_idx) < 4:
+        return None
+
+    def ransac():
+        return cv2.findHomography(keypoint_points(kp)[query_idx], ref_feats.points[train_idx], cv2.RANSAC)[0]
+    h_matrix = timer.time("ransac", ransac)
+    if h_matrix is None:
+        return None
+
+    height, width = img_ref.shape[:2]
+    aligned = timer.time("warp", cv2.warpPerspective, img_test, h_matrix, (width, height))
+
+    def diff():
+        gray_aligned = cv2.cvtColor(aligned, cv2.COLOR_BGR2GRAY)
+        return gray_aligned, processor.difference_mask(gray_ref, gray_aligned)
+    gray_aligned, thresh = timer.time("diff", diff)
+
+    def blobs():
+        filled = fill_holes(thresh)
+        measured = measure_blobs(filled, contour_points(filled), gray_aligned)
+        return processor.build_defects(measured, width, height)
+    defects = timer.time("blobs", blobs)
+
+    timer.time("render", render_defects, aligned, defects)
+    def log():
+        # add_log prints one line per record; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.add_log(os.path.basename(test_path), len(defects), defects_to_records(defects))
+    timer.time("db", log)
+    return len(defects)
+
+
+def run_end_to_end(processor, ref_path, test_path):
+    """The public API path (what the GUI and batch mode call). None when registration fails."""
+    img_ref = processor.load_reference(ref_path)
+    img_test = processor.load_image(test_path)
+    aligned, info = processor.align_images(img_test, img_ref, debug=True, ref_path=ref_path)
+    if info is None:
+        return None
+    return processor.find_defects(img_ref, aligned, ref_path=ref_path).count
+
+
+def bench_case(pairs, repeat, db, store_dir):
+    """Times every stage over all pairs, repeat times. Returns a result dict."""
+    processor = ImageProcessor(reference_store=ReferenceStore(store_dir))
+    timer = StageTimer()
+    end_to_end = []
+
+    # Warm-up: reference features / decoded references are cached in normal use too.
+    # Pairs that cannot be registered are skipped (and counted), as in batch mode.
+    registered = [pair for pair in pairs if run_end_to_end(processor, *pair) is not None]
+    failed = set(pairs) - set(registered)
+    runs = 0
+
+    for _ in range(repeat):
+        for ref_path, test_path in registered:
+            # Stage samples of a run count only if the whole run registered
+            run_timer = StageTimer()
+            if run_stages(processor, db, ref_path, test_path, run_timer) is None:
+                failed.add((ref_path, test_path))
+                continue
+            timer.merge(run_timer)
+            runs += 1
+            start = time.perf_counter()
+            run_end_to_end(processor, ref_path, test_path)
+            end_to_end.append(time.perf_counter() - start)
+
+    if runs == 0:
+        return {"images": len(pairs), "failed": len(failed)}
+
+    # Memory peak of one full inspection (separate pass: tracemalloc slows things down)
+    tracemalloc.start()
+    run_end_to_end(processor, *registered[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Per-image stage time (decode and gray run twice per image: reference + test)
+    stages = {stage: sum(timer.samples.get(stage, [0])) / runs * 1000 for stage in STAGES}
+    return {
+        "images": len(pairs),
+        "failed": len(failed),
+        "pixels": int(np.prod(cv2.imread(pairs[0][1]).shape[:2])),
+        "stages_ms": stages,
+        "total_ms": sum(stages.values()),
+        "end_to_end_ms": statistics.median(end_to_end) * 1000,
+        "throughput": 1.0 / statistics.median(end_to_end),
+        "peak_mb": peak / 1e6,
+    }
+
+
+def print_case(name, result, baseline=None):
+    if "stages_ms" not in result:
+        print(f"\n== {name}: {result['images']} images, registration failed on all of them ==")
+        return
+    print(f"\n== {name}: {result['images']} images, {result['pixels'] / 1e6:.2f} MP ==")
+    rows = list(result["stages_ms"].items()) + [("stage total", result["total_ms"]),
+                                                ("end-to-end", result["end_to_end_ms"])]
+    old_stages = dict(baseline["stages_ms"], **{"stage total": baseline["total_ms"],
+                                                "end-to-end": baseline["end_to_end_ms"]}) if baseline else {}
+    for stage, ms in rows:
+        line = f"  {stage:<14} {ms:9.2f} ms"
+        if stage in old_stages and old_stages[stage] > 0:
+            line += f"   (baseline {old_stages[stage]:9.2f} ms, {100 * (ms / old_stages[stage] - 1):+6.1f}%)"
+        print(line)
+    print(f"  throughput     {result['throughput']:9.1f} img/s   peak memory {result['peak_mb']:.1f} MB")
+    if result["failed"]:
+        print(f"  skipped        {result['failed']} image(s): registration failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the inspection pipeline on the sample boards.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 2, 4],
+                        help="Synthetic upscaling factors (1 = original sample images)")
+    parser.add_argument("--densities", type=float, nargs="+", default=[0, 50],
+                        help="Extra synthetic defects per megapixel")
+    parser.add_argument("--pairs", type=int, default=6, help="Reference/test pairs per case (0 = all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Fail (exit code 1) if end-to-end time regresses by more than this fraction")
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    pairs = sample_pairs(args.pairs)
+    results = {}
+    regressions = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+
+        for scale in args.scales:
+            for density in args.densities:
+                name = f"scale={scale:g} density={density:g}"
+                if scale == 1 and density == 0:
+                    case_pairs = pairs
+                else:
+                    case_dir = os.path.join(tmp, f"s{scale:g}_d{density:g}")
+                    os.makedirs(case_dir)
+                    case_pairs = synthesize(pairs, scale, density, case_dir)
+
+                result = bench_case(case_pairs, args.repeat, db, os.path.join(tmp, "references"))
+                results[name] = result
+                old = baseline["cases"].get(name) if baseline else None
+                print_case(name, result, old)
+
+                if old and "end_to_end_ms" in result and result["end_to_end_ms"] > old["end_to_end_ms"] * (1 + args.tolerance):
+                    regressions.append(name)
+
+        db.close()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                                   "opencv": cv2.__version__, "cpus": os.cpu_count()},
+                       "cases": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\nREGRESSION (> {args.tolerance:.0%} slower end-to-end): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import time
+
+# Taken before any heavy import: everything below counts towards startup
+PROCESS_START = time.perf_counter()
+
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+PAGE_NAMES = ["dashboard", "inspection", "history", "quality"]
+
+
+def measure_once():
+    """Cold start in this (fresh) process. Returns timings in seconds."""
+    timings = {}
+
+    from PyQt6.QtWidgets import QApplication
+    from src.ui.main_window import MainWindow
+    timings["imports"] = time.perf_counter() - PROCESS_START
+
+    app = QApplication(sys.argv)
+    start = time.perf_counter()
+    window = MainWindow()
+    window.show()
+    window.repaint()
+    timings["first_paint"] = time.perf_counter() - PROCESS_START
+    timings["window"] = time.perf_counter() - start
+
+    # Deferred start page work (dashboard chart)
+    app.processEvents()
+    timings["ready"] = time.perf_counter() - PROCESS_START
+    # Heavy modules that were needed for the start page (should stay deferred)
+    timings["modules_loaded"] = sorted(m for m in ("cv2", "matplotlib", "numpy") if m in sys.modules)
+
+    # First navigation to every other page
+    for index, name in enumerate(PAGE_NAMES):
+        if index == 0:
+            continue
+        start = time.perf_counter()
+        window.get_page(index)
+        window.content_area.setCurrentIndex(index)
+        app.processEvents()
+        timings[f"open_{name}"] = time.perf_counter() - start
+
+    window.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures GUI cold-start time (each run in a fresh process).")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts (default: 5)")
+    parser.add_argument("--max-ready", type=float, default=None,
+                        help="Fail (exit code 1) if the median time to a usable window exceeds this (seconds)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return
+
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        timings = json.loads(out.strip().splitlines()[-1])
+        timings["process"] = time.perf_counter() - start
+        runs.append(timings)
+
+    keys = [k for k in runs[0] if k != "modules_loaded"]
+    print(f"Startup over {len(runs)} cold runs (median / max, seconds):")
+    for key in keys:
+        values = [r[key] for r in runs]
+        print(f"  {key:<18} {statistics.median(values):7.3f} / {max(values):7.3f}")
+
+    print(f"  loaded at start    {', '.join(runs[0]['modules_loaded']) or '-'}")
+
+    ready = statistics.median(r["ready"] for r in runs)
+    if args.max_ready is not None and ready > args.max_ready:
+        print(f"FAIL: median ready time {ready:.3f}s > {args.max_ready:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
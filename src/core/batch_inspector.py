@@ -0,0 +1,130 @@
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.core.image_processor import ImageProcessor
+from src.core.tiling import TiledDetector
+from src.core.reference_store import ReferenceStore
+from src.core.defects import defects_to_records
+from src.core.metrics import InspectionMetrics
+from src.core.recipe import resolve_recipe
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# One processor per worker process (keeps its reference feature cache warm)
+_worker_processor = None
+_worker_tiler = None
+
+
+def _init_worker(processor_options, tile_size=None):
+    global _worker_processor, _worker_tiler
+    # Each process already runs on its own core; avoid oversubscribing with OpenCV threads
+    cv2.setNumThreads(1)
+    _worker_processor = ImageProcessor(**processor_options)
+    if tile_size:
+        _worker_tiler = TiledDetector(_worker_processor, tile_size=tile_size, workers=1)
+
+
+def _inspect_one(job):
+    """Load -> align -> detect for one test image. Runs inside a worker process."""
+    ref_path, test_path = job
+    return inspect_pair(_worker_processor or ImageProcessor(), ref_path, test_path, _worker_tiler)
+
+
+def inspect_pair(processor, ref_path, test_path, tiler=None):
+    """
+    Load -> align -> detect for one test image with the given processor.
+
+    Never raises: failures are reported in the "error" field of the result dict.
+    """
+    metrics = InspectionMetrics()
+    try:
+        with metrics.stage("load"):
+            img_ref = processor.load_reference(ref_path)
+            img_test = processor.load_image(test_path)
+        if tiler is not None:
+            # Large panels: warp and compare tile by tile instead of the whole frame
+            h_matrix, _ = processor.estimate_homography(img_test, img_ref, ref_path=ref_path, metrics=metrics)
+            with metrics.stage("tiled_detect"):
+                result = tiler.find_defects(img_ref, img_test, h_matrix if h_matrix is not None else np.eye(3),
+                                            ref_path=ref_path)
+            metrics.count("defects", result.count)
+        else:
+            aligned_img = processor.align_images(img_test, img_ref, ref_path=ref_path, metrics=metrics)
+            # Detection only (no annotated image in headless mode)
+            result = processor.find_defects(img_ref, aligned_img, metrics=metrics, ref_path=ref_path)
+        return {"path": test_path, "filename": os.path.basename(test_path), "defect_count": result.count,
+                "defects": result.defects, "metrics": metrics.to_dict(), "error": None}
+    except Exception as e:
+        return {"path": test_path, "filename": os.path.basename(test_path), "defect_count": None,
+                "defects": None, "metrics": None, "error": str(e)}
+
+
+def collect_test_images(source):
+    """Expands a directory or a glob pattern into a sorted list of image paths."""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+
+
+class BatchInspector:
+    """
+    Headless inspection of a whole folder of test images against one reference.
+
+    Work is spread across a process pool (one worker per core by default) and
+    all results are written to the database in a single bulk insert.
+    """
+    def __init__(self, db=None, max_workers=None, processor_options=None, tile_size=None, recipe=None):
+        self.db = db
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # ImageProcessor keyword arguments for every worker (e.g. align_scale)
+        self.processor_options = processor_options or {}
+        # Tile edge in pixels for memory-bounded detection on very large images (None = whole frame)
+        self.tile_size = tile_size
+        # Recipe, recipe file or name (None = the reference's .recipe.json or the defaults)
+        self.recipe = recipe
+
+    def run(self, ref_path, source):
+        """
+        Inspects every image in source against ref_path.
+
+        Args:
+            ref_path (str): Golden sample image.
+            source (str): Directory or glob pattern of test images.
+
+        Returns:
+            list: One result dict per test image (filename, defect_count, defects, metrics, error).
+        """
+        test_paths = collect_test_images(source)
+        if not test_paths:
+            return []
+
+        # Decode the reference once up front; every worker maps the same raw file
+        try:
+            ReferenceStore().load(ref_path)
+        except FileNotFoundError:
+            pass    # Reported per image by the workers
+
+        # Parsed and validated once here; the immutable recipe is pickled to the workers
+        processor_options = dict(self.processor_options, recipe=resolve_recipe(self.recipe, ref_path))
+
+        jobs = [(ref_path, path) for path in test_paths]
+        workers = min(self.max_workers, len(jobs))
+        chunksize = max(1, len(jobs) // (workers * 4))
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(processor_options, self.tile_size)) as pool:
+            results = list(pool.map(_inspect_one, jobs, chunksize=chunksize))
+
+        if self.db is not None:
+            records = [(r["filename"], r["defect_count"], defects_to_records(r["defects"]), r["metrics"])
+                       for r in results if r["error"] is None]
+            if records:
+                self.db.add_logs_many(records)
+
+        return results
@@ -0,0 +1,142 @@
+import os
+import json
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Gray-level difference that counts as a defect where no region overrides it
+DEFAULT_THRESHOLD = 50
+
+
+class CompiledReference:
+    """
+    A golden sample preprocessed once for detection.
+
+    Holds the reference grayscale, an optional care mask (255 = inspect,
+    0 = don't care: fiducials, silkscreen, labels, ...) and an optional
+    per-pixel difference threshold map built from per-region thresholds.
+    Detection applies both to the difference image in one vectorized step,
+    so ignored regions never become blobs and cost nothing per board.
+    """
+    __slots__ = ("gray", "care_mask", "threshold_map", "threshold")
+
+    def __init__(self, gray, care_mask=None, threshold_map=None, threshold=DEFAULT_THRESHOLD):
+        self.gray = gray
+        self.care_mask = care_mask
+        self.threshold_map = threshold_map
+        self.threshold = threshold
+
+    @property
+    def shape(self):
+        return self.gray.shape[:2]
+
+    def window(self, rows, cols):
+        """The same reference restricted to gray[rows, cols] (views, no copies)."""
+        def crop(arr):
+            return arr[rows, cols] if arr is not None else None
+        return CompiledReference(self.gray[rows, cols], crop(self.care_mask), crop(self.threshold_map),
+                                 self.threshold)
+
+
+def roi_config_path(ref_path):
+    """Sidecar file with the inspection ROIs of a reference, e.g. ref.jpg -> ref.jpg.roi.json."""
+    return f"{ref_path}.roi.json"
+
+
+def load_roi_config(ref_path):
+    """
+    Reads the sidecar ROI file of a reference (None if there is none).
+
+    Format:
+        {
+            "threshold": 50,
+            "exclude": [{"rect": [x, y, w, h]}, {"circle": [cx, cy, r]}, {"polygon": [[x, y], ...]}],
+            "regions": [{"rect": [x, y, w, h], "threshold": 80}, ...]
+        }
+    """
+    path = roi_config_path(ref_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def draw_shape(mask, shape, value):
+    """Fills one ROI shape (rect / circle / polygon dict) into mask with value."""
+    if "rect" in shape:
+        x, y, w, h = (int(v) for v in shape["rect"])
+        mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = value
+    elif "circle" in shape:
+        cx, cy, r = (int(v) for v in shape["circle"])
+        cv2.circle(mask, (cx, cy), r, int(value), -1)
+    elif "polygon" in shape:
+        points = np.array(shape["polygon"], dtype=np.int32).reshape(-1, 1, 2)
+        cv2.fillPoly(mask, [points], int(value))
+    else:
+        raise ValueError(f"Unknown ROI shape: {shape}")
+
+
+def compile_reference(img_ref, config=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Builds a CompiledReference from a BGR reference image and an optional ROI config.
+
+    Args:
+        img_ref (ndarray): Reference image (BGR).
+        config (dict): ROI config (see load_roi_config); None = inspect everything
+            with the default threshold.
+        threshold (int): Default difference threshold (the recipe's), unless the config sets one.
+    """
+    gray = cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY)
+    if not config:
+        return CompiledReference(gray, threshold=threshold)
+
+    threshold = int(config.get("threshold", threshold))
+
+    care_mask = None
+    if config.get("exclude"):
+        care_mask = np.full(gray.shape, 255, dtype=np.uint8)
+        for shape in config["exclude"]:
+            draw_shape(care_mask, shape, 0)
+
+    threshold_map = None
+    if config.get("regions"):
+        threshold_map = np.full(gray.shape, threshold, dtype=np.uint8)
+        for region in config["regions"]:
+            draw_shape(threshold_map, region, int(region["threshold"]))
+
+    return CompiledReference(gray, care_mask, threshold_map, threshold)
+
+
+class CompiledReferenceCache:
+    """
+    LRU cache of compiled references, keyed by reference file and ROI sidecar.
+
+    Editing either the reference image or its .roi.json recompiles it.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _key(self, path, threshold):
+        stat = os.stat(path)
+        sidecar = roi_config_path(path)
+        sidecar_mtime = os.stat(sidecar).st_mtime_ns if os.path.exists(sidecar) else None
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sidecar_mtime, threshold)
+
+    def get(self, path, img_ref, threshold=DEFAULT_THRESHOLD):
+        """Returns the CompiledReference of the reference at path (img_ref = its decoded image)."""
+        key = self._key(path, threshold)
+        compiled = self._entries.get(key)
+        if compiled is not None:
+            self._entries.move_to_end(key)
+            return compiled
+
+        compiled = compile_reference(img_ref, load_roi_config(path), threshold)
+        self._entries[key] = compiled
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        self._entries.clear()
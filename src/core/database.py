@@ -1,70 +1,432 @@
 import sqlite3
+import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import os
 
 class DatabaseManager:
     """
     Handles SQLite database operations for logging inspection results.
+
+    Each thread keeps one long-lived connection (opened on first use) in WAL
+    mode, so readers (GUI pages) are never blocked by the inspection writer.
     """
+    # Database files whose schema has already been created in this process
+    _initialized_paths = set()
+    _init_lock = threading.Lock()
+
+    # Rows per COMMIT in add_logs_many
+    BATCH_SIZE = 1000
+
     def __init__(self, db_name="qualiem_logs.db"):
         # Create database file in the current working directory
         self.db_path = os.path.join(os.getcwd(), db_name)
-        self.create_table()
+        self._local = threading.local()
+
+        with DatabaseManager._init_lock:
+            if self.db_path not in DatabaseManager._initialized_paths:
+                self.create_table()
+                DatabaseManager._initialized_paths.add(self.db_path)
 
     def connect(self):
-        """Establishes a connection to the SQLite database."""
-        return sqlite3.connect(self.db_path)
+        """Returns this thread's connection to the SQLite database (opened once)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            # WAL: readers don't block the writer; NORMAL sync is safe with WAL and avoids an fsync per commit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-16000")  # ~16 MB page cache
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.tx_depth = 0
+        return conn
 
-    def create_table(self):
-        """Creates the logs table if it does not exist."""
+    def close(self):
+        """Closes this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups writes into one COMMIT.
+
+        Usage:
+            with db.transaction():
+                db.add_log("a.jpg", 0)
+                db.add_log("b.jpg", 2)
+        """
         conn = self.connect()
-        cursor = conn.cursor()
-        
-        # Schema: ID, Timestamp, Filename, Defect Count, Status (PASS/FAIL)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                filename TEXT,
-                defect_count INTEGER,
-                status TEXT
-            )
-        """)
-        conn.commit()
-        conn.close()
-
-    def add_log(self, filename, defect_count):
+        self._local.tx_depth += 1
+        try:
+            yield conn.cursor()
+        except Exception:
+            self._local.tx_depth -= 1
+            if self._local.tx_depth == 0:
+                conn.rollback()
+            raise
+        else:
+            self._local.tx_depth -= 1
+            if self._local.tx_depth == 0:
+                conn.commit()
+
+    # Bumped whenever create_table gains new tables/indexes (stored in PRAGMA user_version)
+    SCHEMA_VERSION = 3
+
+    def create_table(self):
+        """
+        Creates (or migrates) the schema: logs, log_summary and defects tables with their indexes.
+
+        Every statement is idempotent, so older databases are upgraded in place.
+        """
+        with self.transaction() as cursor:
+            # Schema: ID, Timestamp, Filename, Defect Count, Status (PASS/FAIL)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    filename TEXT,
+                    defect_count INTEGER,
+                    status TEXT
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_status ON logs (status)")
+
+            # Single-row running totals, kept up to date by triggers (dashboard reads are O(1))
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS log_summary (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total INTEGER NOT NULL,
+                    pass_count INTEGER NOT NULL,
+                    total_defects INTEGER NOT NULL
+                )
+            """)
+            # Seed from existing rows (older databases) on first run
+            cursor.execute("""
+                INSERT OR IGNORE INTO log_summary (id, total, pass_count, total_defects)
+                SELECT 1, COUNT(*), COALESCE(SUM(status = 'PASS'), 0), COALESCE(SUM(defect_count), 0) FROM logs
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_logs_summary_insert AFTER INSERT ON logs
+                BEGIN
+                    UPDATE log_summary SET total = total + 1,
+                                           pass_count = pass_count + (NEW.status = 'PASS'),
+                                           total_defects = total_defects + COALESCE(NEW.defect_count, 0)
+                    WHERE id = 1;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_logs_summary_delete AFTER DELETE ON logs
+                BEGIN
+                    UPDATE log_summary SET total = total - 1,
+                                           pass_count = pass_count - (OLD.status = 'PASS'),
+                                           total_defects = total_defects - COALESCE(OLD.defect_count, 0)
+                    WHERE id = 1;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_logs_summary_update AFTER UPDATE OF status, defect_count ON logs
+                BEGIN
+                    UPDATE log_summary SET pass_count = pass_count - (OLD.status = 'PASS') + (NEW.status = 'PASS'),
+                                           total_defects = total_defects - COALESCE(OLD.defect_count, 0)
+                                                                         + COALESCE(NEW.defect_count, 0)
+                    WHERE id = 1;
+                END
+            """)
+
+            # Schema v2: one row per detected defect (class + location) for Pareto / heatmap analytics
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS defects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    inspection_id INTEGER NOT NULL REFERENCES logs (id) ON DELETE CASCADE,
+                    class TEXT NOT NULL,
+                    x INTEGER,
+                    y INTEGER,
+                    w INTEGER,
+                    h INTEGER,
+                    area REAL,
+                    mean_intensity REAL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_defects_inspection ON defects (inspection_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_defects_class ON defects (class)")
+
+            # Schema v3: stage timings (ms) and counters of each inspection (JSON, see InspectionMetrics)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS inspection_metrics (
+                    inspection_id INTEGER PRIMARY KEY REFERENCES logs (id) ON DELETE CASCADE,
+                    total_ms REAL,
+                    timings TEXT,
+                    counters TEXT
+                )
+            """)
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _insert_log(self, cursor, date_str, filename, defect_count, defects=None, metrics=None):
+        """Inserts one log row (and its defect and metrics rows) and returns the new inspection id."""
+        status = "PASS" if defect_count == 0 else "FAIL"
+        cursor.execute("INSERT INTO logs (timestamp, filename, defect_count, status) VALUES (?, ?, ?, ?)",
+                       (date_str, filename, defect_count, status))
+        inspection_id = cursor.lastrowid
+
+        if defects:
+            cursor.executemany("""
+                INSERT INTO defects (inspection_id, class, x, y, w, h, area, mean_intensity)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(inspection_id, d["class"], *d["bbox"], d["area"], d.get("mean_intensity")) for d in defects])
+
+        if metrics:
+            cursor.execute("INSERT INTO inspection_metrics (inspection_id, total_ms, timings, counters) VALUES (?, ?, ?, ?)",
+                           (inspection_id, metrics["total_ms"], json.dumps(metrics["timings"]),
+                            json.dumps(metrics["counters"])))
+        return inspection_id
+
+    def add_log(self, filename, defect_count, defects=None, metrics=None):
         """
         Inserts a new inspection record into the database.
-        
+
         Args:
             filename (str): Name of the tested image file.
             defect_count (int): Number of defects found.
+            defects (list): Per-defect dicts from DefectResult.to_records() (optional).
+            metrics (dict): InspectionMetrics.to_dict() of this inspection (optional).
+
+        Returns:
+            int: id of the new inspection record.
         """
-        conn = self.connect()
-        cursor = conn.cursor()
-        
         # Get current date and time
         date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Determine status
-        status = "PASS" if defect_count == 0 else "FAIL"
 
         # Insert record
-        cursor.execute("INSERT INTO logs (timestamp, filename, defect_count, status) VALUES (?, ?, ?, ?)",
-                       (date_str, filename, defect_count, status))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as cursor:
+            inspection_id = self._insert_log(cursor, date_str, filename, defect_count, defects, metrics)
+
+        status = "PASS" if defect_count == 0 else "FAIL"
         print(f"[DB] Record added: {filename} -> {status}")
+        return inspection_id
+
+    def add_logs_many(self, records):
+        """
+        Inserts many inspection records, committing every BATCH_SIZE rows.
+
+        Args:
+            records (iterable): (filename, defect_count), (filename, defect_count, defects) or
+                (filename, defect_count, defects, metrics) tuples.
+        """
+        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        records = list(records)
+
+        for start in range(0, len(records), self.BATCH_SIZE):
+            batch = records[start:start + self.BATCH_SIZE]
+            with self.transaction() as cursor:
+                if all(not any(record[2:]) for record in batch):
+                    # No per-defect / metrics rows: one executemany for the whole batch
+                    cursor.executemany("INSERT INTO logs (timestamp, filename, defect_count, status) VALUES (?, ?, ?, ?)",
+                                       [(date_str, record[0], record[1], "PASS" if record[1] == 0 else "FAIL")
+                                        for record in batch])
+                else:
+                    for record in batch:
+                        self._insert_log(cursor, date_str, *record)
+        print(f"[DB] {len(records)} records added")
 
     def get_all_logs(self):
         """Fetches all records from the database, sorted by newest first."""
-        conn = self.connect()
-        cursor = conn.cursor()
-        
+        cursor = self.connect().cursor()
         cursor.execute("SELECT * FROM logs ORDER BY id DESC")
-        data = cursor.fetchall()
-        
-        conn.close()
-        return data
\ No newline at end of file
+        return cursor.fetchall()
+
+    def get_summary(self):
+        """
+        Returns overall totals from the summary table (constant time).
+
+        Returns:
+            dict: total, pass_count, fail_count, total_defects
+        """
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT total, pass_count, total_defects FROM log_summary WHERE id = 1")
+        total, pass_count, total_defects = cursor.fetchone() or (0, 0, 0)
+        return {"total": total, "pass_count": pass_count,
+                "fail_count": total - pass_count, "total_defects": total_defects}
+
+    def get_stats(self, since=None, until=None):
+        """
+        Aggregates inspections inside a time window in SQL (uses the timestamp index).
+
+        Args:
+            since (str): Inclusive lower bound, "YYYY-MM-DD HH:MM:SS" (optional).
+            until (str): Exclusive upper bound, same format (optional).
+
+        Returns:
+            dict: total, pass_count, fail_count, total_defects
+        """
+        if since is None and until is None:
+            return self.get_summary()
+
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+
+        cursor = self.connect().cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(status = 'PASS'), 0), COALESCE(SUM(defect_count), 0)
+            FROM logs WHERE {" AND ".join(conditions)}
+        """, params)
+        total, pass_count, total_defects = cursor.fetchone()
+        return {"total": total, "pass_count": pass_count,
+                "fail_count": total - pass_count, "total_defects": total_defects}
+
+    def get_logs_page(self, before_id=None, limit=500, filename=None, status=None, since=None, until=None):
+        """
+        Fetches one page of records, newest first, using keyset pagination on id.
+
+        Args:
+            before_id (int): Only return rows with id < before_id (the last id of the previous page).
+            limit (int): Page size.
+            filename (str): Substring filter on filename (optional).
+            status (str): "PASS" or "FAIL" (optional).
+            since (str): Inclusive lower timestamp bound (optional).
+            until (str): Exclusive upper timestamp bound (optional).
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if filename:
+            # Literal substring: escape LIKE wildcards in the user's text
+            pattern = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{pattern}%")
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.connect().cursor()
+        cursor.execute(f"SELECT id, timestamp, filename, defect_count, status FROM logs {where} ORDER BY id DESC LIMIT ?",
+                       params + [limit])
+        return cursor.fetchall()
+
+    def get_defect_distribution(self):
+        """
+        Returns the defect-count histogram and the last id it covers.
+
+        Returns:
+            tuple: ([(defect_count, frequency), ...], last_id)
+        """
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM logs")
+        last_id = cursor.fetchone()[0]
+        cursor.execute("SELECT defect_count, COUNT(*) FROM logs WHERE id <= ? GROUP BY defect_count", (last_id,))
+        return cursor.fetchall(), last_id
+
+    def get_recent_defects(self, limit):
+        """Returns the newest (id, defect_count) pairs, oldest first."""
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT id, defect_count FROM logs ORDER BY id DESC LIMIT ?", (limit,))
+        return cursor.fetchall()[::-1]
+
+    def get_defects_after(self, after_id):
+        """Returns (id, defect_count) pairs with id > after_id, oldest first."""
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT id, defect_count FROM logs WHERE id > ? ORDER BY id", (after_id,))
+        return cursor.fetchall()
+
+    def _window(self, since, until, column="l.timestamp"):
+        conditions, params = [], []
+        if since is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append(f"{column} < ?")
+            params.append(until)
+        return conditions, params
+
+    def get_defect_pareto(self, since=None, until=None):
+        """
+        Defect-type frequencies, most frequent first.
+
+        Returns:
+            list: (class, count) tuples.
+        """
+        conditions, params = self._window(since, until)
+        join = "JOIN logs l ON l.id = d.inspection_id" if conditions else ""
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self.connect().cursor()
+        cursor.execute(f"""
+            SELECT d.class, COUNT(*) AS n FROM defects d {join} {where}
+            GROUP BY d.class ORDER BY n DESC
+        """, params)
+        return cursor.fetchall()
+
+    def get_defect_heatmap(self, cell_size=32, defect_class=None, since=None, until=None):
+        """
+        Defect locations binned into a cell_size x cell_size pixel grid (by bbox centre).
+
+        Returns:
+            list: (cell_x, cell_y, count) tuples.
+        """
+        conditions, params = self._window(since, until)
+        join = "JOIN logs l ON l.id = d.inspection_id" if conditions else ""
+        if defect_class is not None:
+            conditions.append("d.class = ?")
+            params.append(defect_class)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self.connect().cursor()
+        cursor.execute(f"""
+            SELECT (d.x + d.w / 2) / ? AS cx, (d.y + d.h / 2) / ? AS cy, COUNT(*)
+            FROM defects d {join} {where}
+            GROUP BY cx, cy
+        """, [cell_size, cell_size] + params)
+        return cursor.fetchall()
+
+    def get_defects_for(self, inspection_id):
+        """Returns (class, x, y, w, h, area, mean_intensity) rows of one inspection."""
+        cursor = self.connect().cursor()
+        cursor.execute("""
+            SELECT class, x, y, w, h, area, mean_intensity FROM defects WHERE inspection_id = ? ORDER BY id
+        """, (inspection_id,))
+        return cursor.fetchall()
+
+    def get_metrics_for(self, inspection_id):
+        """Returns the stored InspectionMetrics dict of one inspection, or None."""
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT total_ms, timings, counters FROM inspection_metrics WHERE inspection_id = ?",
+                       (inspection_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {"total_ms": row[0], "timings": json.loads(row[1]), "counters": json.loads(row[2])}
+
+    def get_stage_averages(self, limit=100):
+        """
+        Average time per stage over the last limit inspections that have metrics.
+
+        Returns:
+            dict: stage -> mean ms.
+        """
+        cursor = self.connect().cursor()
+        cursor.execute("SELECT timings FROM inspection_metrics ORDER BY inspection_id DESC LIMIT ?", (limit,))
+        totals, counts = {}, {}
+        for (timings,) in cursor.fetchall():
+            for stage, ms in json.loads(timings).items():
+                totals[stage] = totals.get(stage, 0.0) + ms
+                counts[stage] = counts.get(stage, 0) + 1
+        return {stage: totals[stage] / counts[stage] for stage in totals}
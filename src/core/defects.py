@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+
+# Defect class names, indexed by the class_id field
+DEFECT_CLASSES = ("pin-hole", "mousebite", "open", "short", "copper")
+
+# One record per defect (compact, picklable, easy to persist)
+DEFECT_DTYPE = np.dtype([
+    ("x", np.int32),
+    ("y", np.int32),
+    ("w", np.int32),
+    ("h", np.int32),
+    ("area", np.float32),
+    ("mean_intensity", np.float32),
+    ("class_id", np.int8),
+])
+
+
+class DefectResult:
+    """
+    Detection output without any rendering.
+
+    defects is a NumPy structured array (DEFECT_DTYPE). The annotated image is
+    only drawn when render() is called, so headless users never pay for it.
+    """
+    __slots__ = ("defects", "thresh", "image", "_rendered")
+
+    def __init__(self, defects, thresh, image=None):
+        self.defects = defects
+        self.thresh = thresh
+        self.image = image          # Aligned test image (used by render)
+        self._rendered = None
+
+    @property
+    def count(self):
+        return len(self.defects)
+
+    @property
+    def labels(self):
+        return [DEFECT_CLASSES[c] for c in self.defects["class_id"]]
+
+    def to_records(self):
+        """Per-defect dicts (class name, bbox, area, mean intensity), e.g. for JSON or the database."""
+        return defects_to_records(self.defects)
+
+    def render(self, image=None):
+        """Draws the labelled boxes (once) and returns the annotated image."""
+        if image is not None:
+            return render_defects(image, self.defects)
+        if self._rendered is None:
+            self._rendered = render_defects(self.image, self.defects)
+        return self._rendered
+
+
+def defects_to_records(defects):
+    """Converts a DEFECT_DTYPE array into plain dicts."""
+    return [{"class": DEFECT_CLASSES[d["class_id"]],
+             "bbox": [int(d["x"]), int(d["y"]), int(d["w"]), int(d["h"])],
+             "area": float(d["area"]),
+             "mean_intensity": float(d["mean_intensity"])}
+            for d in defects]
+
+
+def render_defects(img, defects):
+    """Renders labelled boxes on a copy of img."""
+    result_img = img.copy()
+
+    # Color (Green)
+    box_color = (0, 255, 0)
+
+    # Bottom-up (same order as findContours), so overlapping labels stack as before
+    for d in defects[::-1]:
+        x, y, w, h = int(d["x"]), int(d["y"]), int(d["w"]), int(d["h"])
+        label = DEFECT_CLASSES[d["class_id"]]
+
+        # DRAWİNG
+        cv2.rectangle(result_img, (x, y), (x + w, y + h), box_color, 2)
+
+        (text_w, text_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+
+        if y - 20 > 0:
+            text_y = y - 5
+            bg_rect = (x, y - 20, x + text_w + 4, y)
+        else:
+            text_y = y + h + 15
+            bg_rect = (x, y + h, x + text_w + 4, y + h + 20)
+
+        cv2.rectangle(result_img, (bg_rect[0], bg_rect[1]), (bg_rect[2], bg_rect[3]), (255, 255, 255), -1)
+        cv2.rectangle(result_img, (bg_rect[0], bg_rect[1]), (bg_rect[2], bg_rect[3]), (0, 0, 0), 1)
+
+        cv2.putText(result_img, label, (x + 2, text_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+
+    return result_img
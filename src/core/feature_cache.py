@@ -0,0 +1,138 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class ReferenceFeatures:
+    """
+    ORB features of one golden sample (reference image).
+    """
+    __slots__ = ("gray", "keypoints", "descriptors", "points", "matchers")
+
+    def __init__(self, gray, keypoints, descriptors):
+        self.gray = gray
+        self.keypoints = keypoints
+        self.descriptors = descriptors
+        # Keypoint coordinates as an (N, 2) float32 array, for vectorized point gathering
+        self.points = keypoint_points(keypoints)
+        # Trained matcher indexes for this reference, by matcher name (see src/core/matching.py)
+        self.matchers = {}
+
+    @property
+    def shape(self):
+        return self.gray.shape[:2]
+
+
+def keypoint_points(keypoints):
+    """(x, y) of every keypoint as an (N, 2) float32 array."""
+    if len(keypoints) == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    return cv2.KeyPoint_convert(keypoints).reshape(-1, 2)
+
+
+def keypoints_to_array(keypoints):
+    """Packs cv2.KeyPoint objects into a float32 array (they are not picklable)."""
+    arr = np.zeros((len(keypoints), 7), dtype=np.float32)
+    for i, kp in enumerate(keypoints):
+        arr[i] = (kp.pt[0], kp.pt[1], kp.size, kp.angle, kp.response, kp.octave, kp.class_id)
+    return arr
+
+
+def array_to_keypoints(arr):
+    """Inverse of keypoints_to_array."""
+    return [cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave), int(class_id))
+            for x, y, size, angle, response, octave, class_id in arr]
+
+
+class ReferenceFeatureCache:
+    """
+    LRU cache of reference-image ORB features.
+
+    Entries are keyed by file path + modification time + size, so editing a
+    reference file invalidates it automatically. When cache_dir is given,
+    features are also saved to disk as .npz (named after the file content
+    hash) and survive application restarts.
+    """
+    def __init__(self, max_entries=8, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        # Guards the LRU bookkeeping only (features are computed outside it); see multi_reference
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, path, orb, scale):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, orb.getMaxFeatures(), scale)
+
+    def _disk_path(self, path, orb, scale):
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return os.path.join(self.cache_dir, f"{sha.hexdigest()}_orb{orb.getMaxFeatures()}_s{scale:g}.npz")
+
+    def get(self, path, orb, img_ref=None, scale=1.0):
+        """
+        Returns ReferenceFeatures for the reference file at path.
+
+        Args:
+            path (str): Reference image path.
+            orb: cv2.ORB detector used to compute missing features.
+            img_ref (ndarray): Already decoded reference (optional, avoids a second imread).
+            scale (float): Pyramid level the features are computed on (gray is stored at that size).
+        """
+        key = self._key(path, orb, scale)
+        with self._lock:
+            feats = self._entries.get(key)
+            if feats is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return feats
+            self.misses += 1
+
+        feats = self._load_or_compute(path, orb, img_ref, scale)
+
+        with self._lock:
+            self._entries[key] = feats
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return feats
+
+    def _load_or_compute(self, path, orb, img_ref, scale):
+        disk_path = self._disk_path(path, orb, scale) if self.cache_dir else None
+
+        if disk_path and os.path.exists(disk_path):
+            try:
+                with np.load(disk_path) as data:
+                    descriptors = data["descriptors"] if len(data["descriptors"]) else None
+                    return ReferenceFeatures(data["gray"], array_to_keypoints(data["keypoints"]), descriptors)
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[CACHE] Ignoring corrupt feature file {disk_path}: {e}")
+
+        if img_ref is None:
+            img_ref = cv2.imread(path)
+            if img_ref is None:
+                raise FileNotFoundError(f"ERROR: Image could not be found at -> {path}")
+
+        gray = cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY)
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        keypoints, descriptors = orb.detectAndCompute(gray, None)
+        feats = ReferenceFeatures(gray, keypoints, descriptors)
+
+        if disk_path:
+            np.savez(disk_path, gray=gray, keypoints=keypoints_to_array(keypoints),
+                     descriptors=descriptors if descriptors is not None else np.zeros((0, 32), np.uint8))
+        return feats
+
+    def clear(self):
+        self._entries.clear()
@@ -1,9 +1,187 @@
+from collections import OrderedDict
+
 import cv2
 import numpy as np
 
+from src.core.feature_cache import ReferenceFeatureCache, ReferenceFeatures, keypoint_points
+from src.core.matching import create_matcher
+from src.core.registration_cache import RegistrationCache
+from src.core.reference_store import ReferenceStore
+from src.core.defects import DEFECT_CLASSES, DEFECT_DTYPE, DefectResult
+from src.core.metrics import NULL_METRICS
+from src.core.compiled_reference import CompiledReferenceCache, compile_reference
+from src.core.recipe import DEFAULT_RECIPE
+
+MORPH_KERNEL = np.ones((3, 3), np.uint8)
+
+
+def fill_holes(thresh):
+    """
+    Fills holes (background not reachable from outside the frame), so every blob
+    covers the same region as its filled external contour (RETR_EXTERNAL).
+    """
+    filled = cv2.copyMakeBorder(thresh, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    cv2.floodFill(filled, None, (0, 0), 128)
+    return np.where(filled[1:-1, 1:-1] == 128, 0, 255).astype(np.uint8)
+
+
+def _contour_visit_table():
+    """
+    Times an 8-connected outer contour passes through a blob pixel, indexed by the
+    8-bit code of its neighbours (bits: E, NE, N, NW, W, SW, S, SE).
+
+    This is the 8-connectivity number: the number of separate foreground groups
+    around the pixel. Interior pixels score 0, a plain boundary pixel 1, a pinch
+    or a one pixel wide line 2 or more; an isolated pixel is still one contour point.
+    """
+    table = np.zeros(256, np.uint8)
+    for code in range(256):
+        bg = [not (code >> k) & 1 for k in range(8)]
+        count = sum(bg[k] and not (bg[(k + 1) % 8] and bg[(k + 2) % 8]) for k in (0, 2, 4, 6))
+        table[code] = count if code else 1
+    return table
+
+
+CONTOUR_VISITS = _contour_visit_table()
+NEIGHBOUR_CODE_KERNEL = np.array([[8, 4, 2], [16, 0, 1], [32, 64, 128]], np.float32)
+
+
+def contour_points(filled, padded=None):
+    """
+    Per-pixel count of outer contour points (as cv2.findContours traces them).
+
+    With a hole-free blob the contour polygon runs through the centres of these
+    points, so by Pick's theorem contourArea = pixel_area - points / 2 - 1.
+
+    Args:
+        filled (np.ndarray): Hole-filled blob mask.
+        padded (np.ndarray): filled with a one pixel border of its neighbours (tiles);
+            by default the image border is background, as in findContours.
+
+    Returns:
+        np.ndarray: uint8 image, 0 off the contour.
+    """
+    if padded is None:
+        padded = cv2.copyMakeBorder(filled, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    fg = cv2.threshold(padded, 0, 1, cv2.THRESH_BINARY)[1]
+    # Neighbour code in one pass (sums of distinct powers of two fit uint8 exactly)
+    points = cv2.filter2D(fg, cv2.CV_8U, NEIGHBOUR_CODE_KERNEL, borderType=cv2.BORDER_CONSTANT)
+    cv2.LUT(points, CONTOUR_VISITS, dst=points)
+    cv2.multiply(points, fg, dst=points)
+    return points[1:-1, 1:-1]
+
+
+def measure_blobs(filled, points, gray):
+    """
+    Labels every blob once and measures all of them in one vectorized pass.
+
+    Returns:
+        dict: labels image plus per-blob arrays x, y, w, h, pixel_area,
+        intensity_sum (of gray) and contour_points (see contour_points).
+    """
+    # Label 0 is the background
+    n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8)
+
+    # Only foreground pixels take part in the per-label sums
+    fg = filled != 0
+    on_contour = points != 0
+    return {
+        "labels": labels,
+        "x": stats[1:, cv2.CC_STAT_LEFT],
+        "y": stats[1:, cv2.CC_STAT_TOP],
+        "w": stats[1:, cv2.CC_STAT_WIDTH],
+        "h": stats[1:, cv2.CC_STAT_HEIGHT],
+        "pixel_area": stats[1:, cv2.CC_STAT_AREA],
+        "intensity_sum": np.bincount(labels[fg], weights=gray[fg], minlength=n_labels)[1:],
+        "contour_points": np.bincount(labels[on_contour], weights=points[on_contour], minlength=n_labels)[1:],
+    }
+
+
+def downscale(gray, scale):
+    """Resizes a grayscale image by scale (no-op for 1.0)."""
+    if scale == 1.0:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def registration_error(h_matrix, src_points, dst_points):
+    """RMS distance (px) between h_matrix * src_points and dst_points."""
+    if len(src_points) == 0:
+        return None
+    projected = cv2.perspectiveTransform(src_points.reshape(-1, 1, 2).astype(np.float64), h_matrix).reshape(-1, 2)
+    return float(np.sqrt(np.mean(np.sum((projected - dst_points) ** 2, axis=1))))
+
+
 class ImageProcessor:
-    def __init__(self):
-        self.orb = cv2.ORB_create(nfeatures=5000)
+    def __init__(self, feature_cache=None, align_scale=1.0, align_refine=True, refine_points=64, matcher="bf",
+                 reuse_homography=False, reference_store=None, recipe=None, compiled_references=None,
+                 max_recipes=8):
+        """
+        Args:
+            feature_cache (ReferenceFeatureCache): Shared reference feature cache (optional).
+            reference_store (ReferenceStore): Decoded, memory-mapped reference images (optional).
+            matcher (str): "bf" (cross-checked brute force, best recipe.keep_ratio) or "flann" (LSH + ratio
+                test), or any object with a match(des_test, ref_feats) method.
+            align_scale (float): Pyramid level for feature matching, e.g. 0.25 matches on a
+                quarter-size image (much faster on large boards). 1.0 = full resolution.
+            align_refine (bool): Refine a coarse (align_scale < 1) homography at full
+                resolution with small-window template matching.
+            refine_points (int): Windows used for refinement (speed/accuracy trade-off).
+            reuse_homography (bool): Fixtured boards: reuse the last homography of a reference
+                while a cheap window check still passes (see registration_cache).
+            recipe (Recipe): Inspection parameters (feature count, thresholds, class cutoffs);
+                DEFAULT_RECIPE when not given (see recipe.resolve_recipe).
+            compiled_references (CompiledReferenceCache): Shared compiled-reference cache (optional).
+            max_recipes (int): Processors for other recipes kept by with_recipe (least recently used go first).
+        """
+        self.recipe = recipe if recipe is not None else DEFAULT_RECIPE
+        self.orb = cv2.ORB_create(nfeatures=self.recipe.nfeatures)
+        # Reference features are computed once per golden sample and reused
+        self.feature_cache = feature_cache if feature_cache is not None else ReferenceFeatureCache()
+        # Golden samples are decoded once and memory-mapped afterwards
+        self.reference_store = reference_store if reference_store is not None else ReferenceStore()
+        # Gray image + don't-care mask + region thresholds, once per golden sample (see compiled_reference)
+        self.compiled_references = compiled_references if compiled_references is not None else CompiledReferenceCache()
+        self.align_scale = align_scale
+        self.align_refine = align_refine
+        self.matcher = create_matcher(matcher, self.recipe.keep_ratio)
+        self.refine_points = refine_points
+        self.refine_patch = 10
+        self.refine_search = 8
+
+        # Homography reuse (fixtured conveyor): validated with a few windows per board
+        self.registration_cache = RegistrationCache() if reuse_homography else None
+        self.reuse_check_points = 12
+        self.reuse_max_shift = 1.0
+
+        # Everything but the recipe, for with_recipe()
+        self._options = {"align_scale": align_scale, "align_refine": align_refine, "refine_points": refine_points,
+                         "matcher": matcher, "reuse_homography": reuse_homography}
+        self.max_recipes = max_recipes
+        self._base = self
+        self._siblings = OrderedDict()
+
+    def with_recipe(self, recipe):
+        """
+        Processor for another recipe with the same options and shared caches
+        (reference store, features, compiled references). The last max_recipes
+        recipes are kept; older ones are rebuilt when needed again.
+        """
+        base = self._base
+        if recipe == base.recipe:
+            return base
+        sibling = base._siblings.get(recipe)
+        if sibling is not None:
+            base._siblings.move_to_end(recipe)
+            return sibling
+
+        sibling = ImageProcessor(feature_cache=base.feature_cache, reference_store=base.reference_store,
+                                 recipe=recipe, compiled_references=base.compiled_references, **base._options)
+        sibling._base = base
+        base._siblings[recipe] = sibling
+        while len(base._siblings) > base.max_recipes:
+            base._siblings.popitem(last=False)
+        return sibling
         
     def load_image(self, path):
         img = cv2.imread(path)
@@ -11,120 +189,372 @@ class ImageProcessor:
             raise FileNotFoundError(f"ERROR: Image could not be found at -> {path}")
         return img
 
-    def align_images(self, img_test, img_ref, debug=False):
-        #Alignment Function
-        gray_test = cv2.cvtColor(img_test, cv2.COLOR_BGR2GRAY)
-        gray_ref = cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY)
+    def load_reference(self, path):
+        """Golden sample as a read-only array (decoded once, then memory-mapped from the reference store)."""
+        return self.reference_store.load(path)
 
-        kp1, des1 = self.orb.detectAndCompute(gray_test, None)
-        kp2, des2 = self.orb.detectAndCompute(gray_ref, None)
+    def warm_reference(self, path):
+        """Decodes a reference and computes its features / compiled form ahead of the first inspection."""
+        img_ref = self.load_reference(path)
+        self.get_reference_features(img_ref, path, self.align_scale)
+        self.compile_reference(img_ref, path)
+        return img_ref
 
-        matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-        matches = matcher.match(des1, des2)
-        matches = sorted(matches, key=lambda x: x.distance)
-        matches = matches[:int(len(matches) * 0.15)]
+    def compile_reference(self, img_ref, ref_path=None):
+        """CompiledReference of img_ref; cached (with its .roi.json sidecar) when the path is known."""
+        if ref_path is not None:
+            return self.compiled_references.get(ref_path, img_ref, self.recipe.diff_threshold)
+        return compile_reference(img_ref, threshold=self.recipe.diff_threshold)
 
-        if len(matches) < 4:
-            return (img_test, None) if debug else img_test
+    def get_reference_features(self, img_ref, ref_path=None, scale=1.0):
+        """Reference gray/keypoints/descriptors at the given scale, served from the cache when the path is known."""
+        if ref_path is not None:
+            return self.feature_cache.get(ref_path, self.orb, img_ref, scale)
 
-        src_points = np.zeros((len(matches), 2), dtype=np.float32)
-        dst_points = np.zeros((len(matches), 2), dtype=np.float32)
+        gray_ref = downscale(cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY), scale)
+        kp, des = self.orb.detectAndCompute(gray_ref, None)
+        return ReferenceFeatures(gray_ref, kp, des)
 
-        for i, match in enumerate(matches):
-            src_points[i, :] = kp1[match.queryIdx].pt
-            dst_points[i, :] = kp2[match.trainIdx].pt
+    def reference_gray(self, img_ref, ref_path=None):
+        """Full-resolution gray reference; converted once per golden sample when the path is known."""
+        if ref_path is not None:
+            # Same cache entry the defect detection uses afterwards
+            return self.compile_reference(img_ref, ref_path).gray
+        return cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY)
+
+    def align_images(self, img_test, img_ref, debug=False, ref_path=None, metrics=None):
+        """
+        Warps img_test onto img_ref.
+
+        With debug=True returns (aligned_img, info) where info holds the
+        homography, match/inlier counts and the registration error (RMSE, px);
+        info is None when no homography could be found (img_test is returned as is).
+        Pass an InspectionMetrics as metrics to collect stage timings and counters.
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+
+        #Alignment Function
+        h_matrix, info = self.estimate_homography(img_test, img_ref, ref_path, metrics)
+        if h_matrix is None:
+            return (img_test, None) if debug else img_test
 
-        h_matrix, mask = cv2.findHomography(src_points, dst_points, cv2.RANSAC)
         height, width = img_ref.shape[:2]
-        aligned_img = cv2.warpPerspective(img_test, h_matrix, (width, height))
+        with metrics.stage("warp"):
+            aligned_img = cv2.warpPerspective(img_test, h_matrix, (width, height))
 
         if debug:
-            return aligned_img, None
+            return aligned_img, info
         return aligned_img
 
-    def detect_defects(self, img_ref, img_aligned, min_area=50):
+    def test_features(self, img_test, metrics=None):
+        """
+        Grayscale + ORB features of a test image at align_scale, as (gray, keypoints, descriptors).
+
+        Pass them to estimate_homography(test_features=...) to register one
+        test image against several references without detecting twice.
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+        with metrics.stage("gray"):
+            gray_test = cv2.cvtColor(img_test, cv2.COLOR_BGR2GRAY)
+        with metrics.stage("orb"):
+            kp, des = self.orb.detectAndCompute(downscale(gray_test, self.align_scale), None)
+        metrics.count("keypoints", len(kp))
+        return gray_test, kp, des
+
+    def estimate_homography(self, img_test, img_ref, ref_path=None, metrics=None, test_features=None):
+        """
+        Computes the test -> reference homography without warping.
+
+        Features are matched on the align_scale pyramid level; the homography is
+        scaled back to full resolution and refined there (see refine_homography).
+        test_features (from test_features()) skips the test-side ORB detection.
+
+        Returns:
+            tuple: (h_matrix, info), or (None, None) when registration fails.
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+        scale = self.align_scale
+        if test_features is not None:
+            gray_test, kp1, des1 = test_features
+        else:
+            with metrics.stage("gray"):
+                gray_test = cv2.cvtColor(img_test, cv2.COLOR_BGR2GRAY)
+            kp1 = des1 = None
+        with metrics.stage("ref_features"):
+            ref_feats = self.get_reference_features(img_ref, ref_path, scale)
+        metrics.count("pixels", gray_test.size)
+
+        # Stable pose: reuse the previous homography if it still fits
+        reuse = self.registration_cache is not None and ref_path is not None
+        if reuse:
+            with metrics.stage("reuse_check"):
+                cached = self.registration_cache.get(ref_path)
+                gray_ref = ref_feats.gray if scale == 1.0 else self.reference_gray(img_ref, ref_path)
+                valid = cached is not None and self.validate_homography(gray_test, gray_ref, *cached)
+            metrics.count("pose_reused", int(valid))
+            if valid:
+                self.registration_cache.hits += 1
+                return cached[0], {"h_matrix": cached[0], "matches": 0, "inliers": 0, "rmse": None, "reused": True}
+            self.registration_cache.misses += 1
+
+        if kp1 is None:
+            with metrics.stage("orb"):
+                kp1, des1 = self.orb.detectAndCompute(downscale(gray_test, scale), None)
+            metrics.count("keypoints", len(kp1))
+        if des1 is None or ref_feats.descriptors is None:
+            return None, None
+
+        with metrics.stage("match"):
+            query_idx, train_idx = self.matcher.match(des1, ref_feats)
+        metrics.count("matches", len(query_idx))
+
+        if len(query_idx) < 4:
+            return None, None
+
+        with metrics.stage("ransac"):
+            src_points = keypoint_points(kp1)[query_idx]
+            dst_points = ref_feats.points[train_idx]
+            h_matrix, mask = cv2.findHomography(src_points, dst_points, cv2.RANSAC)
+        if h_matrix is None:
+            return None, None
+
+        inliers = mask.ravel().astype(bool)
+        metrics.count("inliers", int(inliers.sum()))
+        metrics.count("inlier_ratio", float(inliers.mean()))
+        src_points, dst_points = src_points[inliers], dst_points[inliers]
+
+        if scale != 1.0:
+            # Coarse level -> full resolution: H_full = S^-1 * H_small * S
+            s_mat = np.diag([scale, scale, 1.0])
+            h_matrix = np.linalg.inv(s_mat) @ h_matrix @ s_mat
+            src_points /= scale
+            dst_points /= scale
+
+            if self.align_refine:
+                with metrics.stage("refine"):
+                    gray_ref = self.reference_gray(img_ref, ref_path)
+                    # Coarse error grows with the downscale factor: widen the search accordingly
+                    search = max(self.refine_search, int(np.ceil(2 / scale)))
+                    refined, ref_src, ref_dst = self.refine_homography(gray_test, gray_ref, h_matrix, dst_points,
+                                                                       search)
+                if ref_src is not None:
+                    h_matrix, src_points, dst_points = refined, ref_src, ref_dst
+
+        if reuse:
+            self.registration_cache.put(ref_path, h_matrix, dst_points)
+
+        info = {
+            "h_matrix": h_matrix,
+            "matches": len(query_idx),
+            "inliers": int(inliers.sum()),
+            "rmse": registration_error(h_matrix, src_points, dst_points),
+            "reused": False,
+        }
+        return h_matrix, info
+
+    def match_windows(self, gray_test, gray_ref, h_matrix, ref_points, search, max_points):
+        """
+        Measures the residual shift of h_matrix around reference points.
+
+        For up to max_points reference points, a small window of the test image is
+        warped with h_matrix and template-matched against the reference patch.
+        Only these windows are touched, so this is cheap even on huge images.
+
+        Returns:
+            tuple: (matched, tried) where matched is a list of ((cx, cy), (dx, dy))
+            meaning reference point (cx, cy) appears at (cx + dx, cy + dy) in the
+            warped test image, and tried is the number of textured windows tested.
+        """
+        r = self.refine_patch             # Template half-size (search = max correction in px)
+        big = r + search
+        height, width = gray_ref.shape[:2]
+
+        # Points far enough from the border, evenly sampled
+        inside = (ref_points[:, 0] >= big) & (ref_points[:, 0] < width - big) & \
+                 (ref_points[:, 1] >= big) & (ref_points[:, 1] < height - big)
+        points = ref_points[inside]
+        if len(points) > max_points:
+            points = points[np.linspace(0, len(points) - 1, max_points).astype(int)]
+
+        matched, tried = [], 0
+        for px, py in points:
+            cx, cy = int(round(px)), int(round(py))
+            template = gray_ref[cy - r:cy + r + 1, cx - r:cx + r + 1]
+            if template.std() < 5:  # Flat patch, nothing to lock on to
+                continue
+            tried += 1
+
+            # Test image warped into the reference frame, only inside this window
+            shift = np.array([[1, 0, big - cx], [0, 1, big - cy], [0, 0, 1]], dtype=np.float64)
+            window = cv2.warpPerspective(gray_test, shift @ h_matrix, (2 * big + 1, 2 * big + 1))
+
+            scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+            if best < 0.8:
+                continue
+
+            # Sub-pixel peak (parabola through the neighbours)
+            dx, dy = float(bx - search), float(by - search)
+            if 0 < bx < scores.shape[1] - 1:
+                left, mid, right = scores[by, bx - 1], scores[by, bx], scores[by, bx + 1]
+                denom = left - 2 * mid + right
+                dx += 0.5 * (left - right) / denom if denom != 0 else 0.0
+            if 0 < by < scores.shape[0] - 1:
+                up, mid, down = scores[by - 1, bx], scores[by, bx], scores[by + 1, bx]
+                denom = up - 2 * mid + down
+                dy += 0.5 * (up - down) / denom if denom != 0 else 0.0
+
+            matched.append(((cx, cy), (dx, dy)))
+
+        return matched, tried
+
+    def refine_homography(self, gray_test, gray_ref, h_matrix, ref_points, search=8):
+        """
+        Refines a coarse test->reference homography at full resolution.
+
+        Residual shifts are measured with match_windows around up to refine_points
+        reference keypoints, and the homography is re-fitted on the corrected
+        correspondences.
+
+        Returns:
+            tuple: (h_matrix, src_points, dst_points) of the refined fit, or the
+            inputs unchanged when too few windows could be matched.
+        """
+        matched, _ = self.match_windows(gray_test, gray_ref, h_matrix, ref_points, search, self.refine_points)
+        if len(matched) < 8:
+            return h_matrix, None, None
+
+        # Map the corrected positions back into test image coordinates
+        src = np.float64([(cx + dx, cy + dy) for (cx, cy), (dx, dy) in matched])
+        src = cv2.perspectiveTransform(src.reshape(-1, 1, 2), np.linalg.inv(h_matrix)).reshape(-1, 2)
+        dst = np.float64([point for point, _ in matched])
+
+        refined, mask = cv2.findHomography(src, dst, cv2.RANSAC, 2.0)
+        if refined is None:
+            return h_matrix, None, None
+        inliers = mask.ravel().astype(bool)
+        return refined, src[inliers], dst[inliers]
+
+    def validate_homography(self, gray_test, gray_ref, h_matrix, ref_points):
+        """
+        Cheap check that a previous homography still fits this test image.
+
+        Passes when most textured check windows lock on within reuse_max_shift px.
+        """
+        matched, tried = self.match_windows(gray_test, gray_ref, h_matrix, ref_points,
+                                            self.refine_search, self.reuse_check_points)
+        if tried == 0 or len(matched) < 0.8 * tried:
+            return False
+        shifts = np.hypot(*np.float64([offset for _, offset in matched]).T)
+        return float(np.median(shifts)) <= self.reuse_max_shift
+
+    # Defect class names, indexed by the class ids computed in classify_defects
+    DEFECT_CLASSES = DEFECT_CLASSES
+
+    def classify_defects(self, areas, mean_vals):
+        """
+        Vectorized classification of defect blobs.
+
+        CASE 1: WHITE EXCESS (Ground Color) MISSING COPPER -> pin-hole / mousebite / open
+        CASE 2: EXCESS BLACK (Road Color) EXCESS COPPER   -> short / copper
+        """
+        recipe = self.recipe
+        missing_copper = mean_vals > recipe.copper_intensity
+        return np.where(missing_copper,
+                        np.where(areas < recipe.pinhole_max_area, 0,
+                                 np.where(areas < recipe.mousebite_max_area, 1, 2)),
+                        np.where(areas > recipe.short_min_area, 3, 4)).astype(np.int8)
+
+    def detect_defects(self, img_ref, img_aligned, min_area=None, draw=True, metrics=None, ref_path=None):
         """
         Black Path / White Background + Edge Cleaning
+
+        Returns (result_img, thresh, defect_count). Set draw=False to skip
+        rendering the annotated image (result_img is None).
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+        result = self.find_defects(img_ref, img_aligned, min_area, metrics, ref_path)
+        with metrics.stage("render"):
+            result_img = result.render() if draw else None
+        return result_img, result.thresh, result.count
+
+    def find_defects(self, img_ref, img_aligned, min_area=None, metrics=None, ref_path=None):
         """
+        Detection only: returns a DefectResult (structured per-defect array + threshold mask).
+
+        All blobs are measured in one pass with connectedComponentsWithStats
+        (area, bbox) and np.bincount over the label image (mean intensity).
+        With ref_path the compiled reference (cached gray, don't-care mask and
+        region thresholds from ref_path + ".roi.json") is used.
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+
         # turn gray
-        gray_ref = cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY)
-        gray_test = cv2.cvtColor(img_aligned, cv2.COLOR_BGR2GRAY)
-        
-        # Get image dimensions (for border control)
+        with metrics.stage("defect_gray"):
+            reference = self.compile_reference(img_ref, ref_path)
+            gray_ref = reference.gray
+            gray_test = cv2.cvtColor(img_aligned, cv2.COLOR_BGR2GRAY)
+
+        with metrics.stage("diff"):
+            thresh = self.difference_mask(gray_ref, gray_test, reference)
+        with metrics.stage("blobs"):
+            filled = fill_holes(thresh)
+            blobs = measure_blobs(filled, contour_points(filled), gray_test)
+
         img_h, img_w = gray_ref.shape[:2]
-        border_margin = 10 #How many pixels inward from the edge will we consider safe
+        with metrics.stage("classify"):
+            defects = self.build_defects(blobs, img_w, img_h, min_area)
+        metrics.count("contours", len(blobs["x"]))
+        metrics.count("defects", len(defects))
+        return DefectResult(defects, thresh, img_aligned)
 
+    def difference_mask(self, gray_ref, gray_test, reference=None):
+        """
+        Black Path / White Background: thresholded, cleaned |ref - test|.
+
+        reference (CompiledReference, optional) supplies per-region thresholds and
+        the don't-care mask, both applied to the whole diff at once.
+        """
         # Find the Difference
         diff = cv2.absdiff(gray_ref, gray_test)
-        _, thresh = cv2.threshold(diff, 50, 255, cv2.THRESH_BINARY)
+        if reference is not None and reference.threshold_map is not None:
+            thresh = cv2.compare(diff, reference.threshold_map, cv2.CMP_GT)
+        else:
+            threshold = reference.threshold if reference is not None else self.recipe.diff_threshold
+            _, thresh = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
 
-        kernel = np.ones((3, 3), np.uint8)
-        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-        thresh = cv2.dilate(thresh, kernel, iterations=1)
+        if reference is not None and reference.care_mask is not None:
+            # Don't-care regions (fiducials, silkscreen, ...) never become blobs
+            cv2.bitwise_and(thresh, reference.care_mask, dst=thresh)
 
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, MORPH_KERNEL)
+        thresh = cv2.dilate(thresh, MORPH_KERNEL, iterations=1)
+        return thresh
 
-        result_img = img_aligned.copy()
-        defect_count = 0
-        
-        # Color (Green)
-        box_color = (0, 255, 0) 
-        
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            
-            if area > min_area:
-                x, y, w, h = cv2.boundingRect(cnt)
-
-                # ---  (BORDER CHECK) ---
-                # If the box is too close to the edges of the image, skip
-                if (x < border_margin) or \
-                   (y < border_margin) or \
-                   (x + w > img_w - border_margin) or \
-                   (y + h > img_h - border_margin):
-                    continue 
-
-                # def count
-                defect_count += 1
-                
-                #COLOR ANALYSIS
-                mask_roi = np.zeros_like(gray_test)
-                cv2.drawContours(mask_roi, [cnt], -1, 255, -1)
-                mean_val = cv2.mean(gray_test, mask=mask_roi)[0]
-                
-                # CLASSİFİCATİON
-                # CASE 1: WHITE EXCESS (Ground Color) MISSING COPPER
-                if mean_val > 150: 
-                    if area < 200:
-                        label = "pin-hole"
-                    elif area < 600:
-                        label = "mousebite"
-                    else:
-                        label = "open"
-                        
-                # CASE 2: EXCESS BLACK (Road Color) EXCESS COPPER
-                else: 
-                    if area > 350:
-                        label = "short"
-                    else:
-                        label = "copper"
-                
-                # DRAWİNG
-                cv2.rectangle(result_img, (x, y), (x + w, y + h), box_color, 2)
-                
-                (text_w, text_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                
-                if y - 20 > 0:
-                    text_y = y - 5
-                    bg_rect = (x, y - 20, x + text_w + 4, y)
-                else:
-                    text_y = y + h + 15
-                    bg_rect = (x, y + h, x + text_w + 4, y + h + 20)
-                
-                cv2.rectangle(result_img, (bg_rect[0], bg_rect[1]), (bg_rect[2], bg_rect[3]), (255, 255, 255), -1)
-                cv2.rectangle(result_img, (bg_rect[0], bg_rect[1]), (bg_rect[2], bg_rect[3]), (0, 0, 0), 1)
-                
-                cv2.putText(result_img, label, (x + 2, text_y), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
-        
-        return result_img, thresh, defect_count
\ No newline at end of file
+    def build_defects(self, blobs, img_w, img_h, min_area=None):
+        """Size filter, border check and classification of measured blobs (see measure_blobs)."""
+        border_margin = self.recipe.border_margin #How many pixels inward from the edge will we consider safe
+        min_area = self.recipe.min_area if min_area is None else min_area
+        xs, ys, ws, hs = blobs["x"], blobs["y"], blobs["w"], blobs["h"]
+
+        # COLOR ANALYSIS: mean gray value per blob
+        mean_vals = blobs["intensity_sum"] / np.maximum(blobs["pixel_area"], 1)
+
+        # Contour (polygon) area through the centres of the contour points (Pick's
+        # theorem): equal to cv2.contourArea, so the area thresholds keep their meaning
+        areas = np.maximum(blobs["pixel_area"] - blobs["contour_points"] / 2.0 - 1, 0)
+
+        # Size filter + (BORDER CHECK): skip boxes too close to the edges of the image
+        keep = (areas > min_area) & \
+               (xs >= border_margin) & (ys >= border_margin) & \
+               (xs + ws <= img_w - border_margin) & (ys + hs <= img_h - border_margin)
+
+        defects = np.empty(int(keep.sum()), dtype=DEFECT_DTYPE)
+        defects["x"] = xs[keep]
+        defects["y"] = ys[keep]
+        defects["w"] = ws[keep]
+        defects["h"] = hs[keep]
+        defects["area"] = areas[keep]
+        defects["mean_intensity"] = mean_vals[keep]
+        defects["class_id"] = self.classify_defects(areas[keep], mean_vals[keep])
+        return defects
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import cv2
+import numpy as np
+
+from src.core.image_processor import ImageProcessor
+from src.core.reference_store import ReferenceStore
+from src.core.defects import defects_to_records
+from src.core.metrics import InspectionMetrics
+from src.core.recipe import resolve_recipe
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+                500: "Internal Server Error"}
+
+# One processor per worker process (reference features stay warm between requests)
+_worker_processor = None
+# Service-wide recipe name/file (None = each reference's .recipe.json or the defaults)
+_worker_recipe = None
+
+
+def _init_worker(processor_options, preload=(), recipe=None):
+    global _worker_processor, _worker_recipe
+    # Each process already runs on its own core; avoid oversubscribing with OpenCV threads
+    cv2.setNumThreads(1)
+    _worker_processor = ImageProcessor(**processor_options)
+    _worker_recipe = recipe
+    for path in preload:
+        try:
+            _worker_processor.with_recipe(resolve_recipe(recipe, path)).warm_reference(path)
+        except FileNotFoundError:
+            pass    # Reported when a request uses it
+
+
+def decode_image(data):
+    """Decodes encoded image bytes (JPEG, PNG, BMP, ...) into a BGR array."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Uploaded test image could not be decoded")
+    return img
+
+
+def _run_request(job):
+    """
+    Align (and detect) one test image. Runs inside a worker process.
+
+    job: dict with reference (path), test (path) or test_data (encoded bytes),
+    recipe, min_area, annotate and align_only. Raises FileNotFoundError /
+    ValueError for client errors.
+    """
+    ref_path = job["reference"]
+    recipe = resolve_recipe(job.get("recipe") or _worker_recipe, ref_path)
+    processor = (_worker_processor or ImageProcessor()).with_recipe(recipe)
+    metrics = InspectionMetrics()
+
+    with metrics.stage("load"):
+        img_ref = processor.load_reference(ref_path)
+        if job.get("test_data") is not None:
+            img_test = decode_image(job["test_data"])
+        else:
+            img_test = processor.load_image(job["test"])
+
+    if job.get("align_only"):
+        h_matrix, info = processor.estimate_homography(img_test, img_ref, ref_path=ref_path, metrics=metrics)
+        if h_matrix is None:
+            raise ValueError("Alignment failed: no homography found")
+        return {"homography": np.asarray(h_matrix).tolist(), "matches": int(info["matches"]),
+                "inliers": int(info["inliers"]),
+                "rmse": float(info["rmse"]) if info.get("rmse") is not None else None,
+                "metrics": metrics.to_dict()}
+
+    aligned_img, info = processor.align_images(img_test, img_ref, debug=True, ref_path=ref_path, metrics=metrics)
+    if info is None:
+        raise ValueError("Alignment failed: no homography found")
+    result = processor.find_defects(img_ref, aligned_img, job.get("min_area"), metrics, ref_path)
+
+    response = {"status": "PASS" if result.count == 0 else "FAIL", "recipe": recipe.name, "defect_count": result.count,
+                "defects": defects_to_records(result.defects), "metrics": metrics.to_dict()}
+    if job.get("annotate"):
+        ok, encoded = cv2.imencode(".jpg", result.render(aligned_img), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        response["annotated_jpeg"] = base64.b64encode(encoded.tobytes()).decode("ascii")
+    return response
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class InspectionService:
+    """
+    Local HTTP API around the inspection engine (for MES / line integration).
+
+    Built on asyncio streams (no web framework needed). The event loop only
+    parses requests; alignment and detection run in a process pool whose
+    workers keep reference images and features warm between requests, so
+    concurrent requests are processed in parallel.
+
+    Endpoints (JSON responses):
+        GET  /health            worker count and uptime
+        GET  /references        references warmed at startup or uploaded
+        POST /references        raw image body -> stored reference, returns its path
+        POST /inspect           align + detect -> defect list
+        POST /align             homography only
+
+    /inspect and /align take either a JSON body
+        {"reference": path, "test": path | "test_data": base64, "recipe": name,
+         "min_area": 50, "annotate": false}
+    (recipe: a name in data/recipes; min_area defaults to the recipe's)
+    or the raw test image as body with ?reference=path (and the other fields) in the query string.
+    """
+    MAX_BODY = 64 * 1024 * 1024
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=None, processor_options=None, preload=(),
+                 db=None, upload_dir=None, recipe=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.processor_options = processor_options or {}
+        self.references = [os.path.abspath(p) for p in preload]
+        self.db = db
+        self.upload_dir = upload_dir or os.path.join(os.getcwd(), ".qualiem_cache", "uploads")
+        # Validated up front so a bad recipe fails at startup, not on the first request
+        if recipe is not None:
+            resolve_recipe(recipe)
+        self.recipe = recipe
+        self.pool = None
+        self.server = None
+        self.started = None
+        self.handled = 0
+
+    async def start(self):
+        # Decode the references once up front; every worker maps the same raw file
+        store = ReferenceStore()
+        for path in self.references:
+            try:
+                store.load(path)
+            except FileNotFoundError:
+                print(f"[SERVICE] Reference not found: {path}")
+
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(self.processor_options, tuple(self.references), self.recipe))
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.started = time.monotonic()
+        print(f"[SERVICE] Listening on http://{self.host}:{self.port} with {self.workers} workers")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    # --- HTTP ---
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    status, payload = await self._dispatch(method, target, headers, body)
+                except HttpError as e:
+                    status, payload, headers = e.status, {"error": str(e)}, {"connection": "close"}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass    # Client went away
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(411, "Chunked bodies are not supported, send Content-Length")
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.MAX_BODY:
+            raise HttpError(413, f"Body larger than {self.MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    # --- Routes ---
+    async def _dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        route = (method, url.path.rstrip("/") or "/")
+        self.handled += 1
+
+        if route == ("GET", "/health"):
+            return 200, {"status": "ok", "workers": self.workers, "handled": self.handled,
+                         "uptime_s": round(time.monotonic() - self.started, 1)}
+        if route == ("GET", "/references"):
+            return 200, {"references": self.references}
+        if route == ("POST", "/references"):
+            # Decoding and writing a large image would block every other connection
+            path = await asyncio.get_running_loop().run_in_executor(None, self._store_reference, body)
+            if path not in self.references:
+                self.references.append(path)
+            return 200, {"reference": path}
+        if route in (("POST", "/inspect"), ("POST", "/align")):
+            job = self._parse_job(headers, url.query, body)
+            job["align_only"] = url.path.rstrip("/") == "/align"
+            return await self._run(job)
+        if url.path.rstrip("/") in ("/health", "/references", "/inspect", "/align"):
+            raise HttpError(405, f"{method} not allowed on {url.path}")
+        raise HttpError(404, f"No route {url.path}")
+
+    def _parse_job(self, headers, query, body):
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                job = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Invalid JSON body")
+            if not isinstance(job, dict):
+                raise HttpError(400, "JSON body must be an object")
+            if job.get("test_data") is not None:
+                try:
+                    job["test_data"] = base64.b64decode(job["test_data"], validate=True)
+                except (ValueError, TypeError):
+                    # binascii.Error (bad alphabet / padding) is a ValueError; TypeError: not a string
+                    raise HttpError(400, "test_data is not valid base64")
+        else:
+            # Raw image body, parameters in the query string
+            job = {key: values[-1] for key, values in parse_qs(query).items()}
+            job["test_data"] = body or None
+            job["annotate"] = job.get("annotate", "").lower() in ("1", "true", "yes")
+
+        if not job.get("reference"):
+            raise HttpError(400, "reference is required")
+        for key in ("reference", "test", "recipe"):
+            # Paths and recipe names only (a recipe object here would reach os.path as a dict)
+            if job.get(key) is not None and not isinstance(job[key], str):
+                raise HttpError(400, f"{key} must be a string")
+        if job.get("test_data") is None and not job.get("test"):
+            raise HttpError(400, "test (path) or test image data is required")
+        if job.get("min_area") is not None:
+            try:
+                job["min_area"] = float(job["min_area"])
+            except (TypeError, ValueError):
+                raise HttpError(400, "min_area must be a number")
+        return job
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self.pool, _run_request, job)
+        except FileNotFoundError as e:
+            return 404, {"error": str(e)}
+        except ValueError as e:
+            return 422, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+        response = result
+        if not job["align_only"] and self.db is not None:
+            name = os.path.basename(job.get("test") or "upload")
+            # Off the event loop: sqlite writes block
+            await loop.run_in_executor(None, self.db.add_log, name, response["defect_count"],
+                                       response["defects"], response["metrics"])
+        response["server_ms"] = (time.perf_counter() - start) * 1000
+        return 200, response
+
+    def _store_reference(self, body):
+        """
+        Saves an uploaded reference under its content hash; returns the path to use in requests.
+        Runs on a thread (no shared state here; the caller registers the path).
+        """
+        if not body:
+            raise HttpError(400, "Empty reference image")
+        try:
+            img = decode_image(body)
+        except ValueError:
+            raise HttpError(422, "Reference image could not be decoded")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, hashlib.sha1(body).hexdigest()[:16] + ".png")
+        if not os.path.exists(path):
+            cv2.imwrite(path, img)
+        return path
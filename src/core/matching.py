@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+
+def top_k(distances, k):
+    """
+    Indices of the k smallest distances, in ascending (stable) distance order.
+
+    Selection is O(n) with np.partition; only the k winners are sorted. The
+    result equals sorted(...)[:k] exactly (ties keep their original order),
+    which matters because RANSAC's outcome depends on the point order.
+    """
+    n = len(distances)
+    if k <= 0:
+        return np.empty(0, np.intp)
+    if k < n:
+        kth = np.partition(distances, k - 1)[k - 1]
+        below = np.flatnonzero(distances < kth)
+        ties = np.flatnonzero(distances == kth)[:k - len(below)]
+        selected = np.sort(np.concatenate([below, ties]))
+    else:
+        selected = np.arange(n)
+    return selected[np.argsort(distances[selected], kind="stable")]
+
+
+class BruteForceMatcher:
+    """
+    Cross-checked brute-force Hamming matching, keeping the best keep_ratio of matches.
+
+    This is the original alignment behaviour; the cv2 matcher is created once
+    and the top matches are selected with top_k instead of sorting every DMatch.
+    """
+    name = "bf"
+
+    def __init__(self, keep_ratio=0.15):
+        self.keep_ratio = keep_ratio
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+
+    def match(self, des_test, ref_feats):
+        """
+        Returns (query_idx, train_idx) index arrays into the test and reference keypoints.
+        """
+        matches = self.matcher.match(des_test, ref_feats.descriptors)
+        if not matches:
+            return np.empty(0, np.int32), np.empty(0, np.int32)
+
+        query_idx = np.fromiter((m.queryIdx for m in matches), np.int32, len(matches))
+        train_idx = np.fromiter((m.trainIdx for m in matches), np.int32, len(matches))
+        distances = np.fromiter((m.distance for m in matches), np.float32, len(matches))
+
+        best = top_k(distances, int(len(matches) * self.keep_ratio))
+        return query_idx[best], train_idx[best]
+
+
+class FlannMatcher:
+    """
+    FLANN LSH matching for binary (ORB) descriptors with Lowe's ratio test.
+
+    The LSH index is trained once per reference and stored on its cached
+    ReferenceFeatures, so later calls only query it.
+    """
+    name = "flann"
+
+    def __init__(self, ratio=0.75, keep_ratio=None):
+        self.ratio = ratio
+        self.keep_ratio = keep_ratio
+        # FLANN_INDEX_LSH = 6
+        self.index_params = dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1)
+        self.search_params = dict(checks=32)
+
+    def _trained(self, ref_feats):
+        matcher = ref_feats.matchers.get(self.name)
+        if matcher is None:
+            matcher = cv2.FlannBasedMatcher(self.index_params, self.search_params)
+            matcher.add([ref_feats.descriptors])
+            matcher.train()
+            ref_feats.matchers[self.name] = matcher
+        return matcher
+
+    def match(self, des_test, ref_feats):
+        """
+        Returns (query_idx, train_idx) index arrays into the test and reference keypoints.
+        """
+        knn = self._trained(ref_feats).knnMatch(des_test, k=2)
+        pairs = [pair for pair in knn if len(pair) == 2]
+        if not pairs:
+            return np.empty(0, np.int32), np.empty(0, np.int32)
+
+        query_idx = np.fromiter((p[0].queryIdx for p in pairs), np.int32, len(pairs))
+        train_idx = np.fromiter((p[0].trainIdx for p in pairs), np.int32, len(pairs))
+        best = np.fromiter((p[0].distance for p in pairs), np.float32, len(pairs))
+        second = np.fromiter((p[1].distance for p in pairs), np.float32, len(pairs))
+
+        # Ratio test: keep matches clearly better than the runner-up
+        keep = best < self.ratio * second
+        query_idx, train_idx, best = query_idx[keep], train_idx[keep], best[keep]
+
+        if self.keep_ratio is not None:
+            selected = top_k(best, int(len(best) * self.keep_ratio))
+            query_idx, train_idx = query_idx[selected], train_idx[selected]
+        return query_idx, train_idx
+
+
+MATCHERS = {
+    "bf": BruteForceMatcher,
+    "flann": FlannMatcher,
+}
+
+
+def create_matcher(matcher, keep_ratio=0.15):
+    """
+    Accepts a matcher name ("bf", "flann") or an object with a match(des_test, ref_feats) method.
+
+    keep_ratio is the share of best matches kept by the brute-force matcher
+    (FLANN filters with its ratio test instead).
+    """
+    if isinstance(matcher, str):
+        if matcher not in MATCHERS:
+            raise ValueError(f"Unknown matcher '{matcher}' (expected one of: {', '.join(MATCHERS)})")
+        if matcher == "bf":
+            return BruteForceMatcher(keep_ratio)
+        return MATCHERS[matcher]()
+    return matcher
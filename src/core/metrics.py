@@ -0,0 +1,117 @@
+import io
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+class InspectionMetrics:
+    """
+    Stage timings (ms) and counters of one inspection.
+
+    Pass an instance to ImageProcessor.align_images / find_defects (metrics=...)
+    to collect them. on_stage(name, ms) is called as soon as a stage finishes,
+    e.g. to show progress; to_dict() is what gets stored in the database.
+    """
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self.counters = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            ms = (perf_counter() - start) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + ms
+            if self.on_stage is not None:
+                self.on_stage(name, ms)
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def merge(self, other):
+        """Adds the timings and counters of another InspectionMetrics (e.g. of a sub-task run on a thread)."""
+        for name, ms in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + ms
+        self.counters.update(other.counters)
+
+    @property
+    def total_ms(self):
+        return sum(self.timings.values())
+
+    def to_dict(self):
+        return {"total_ms": self.total_ms, "timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def summary(self):
+        """One-line text for status bars, e.g. "92 ms | orb 10 | match 46 | ... | keypoints 5000"."""
+        parts = [f"{self.total_ms:.0f} ms"]
+        parts += [f"{name} {ms:.0f}" for name, ms in self.timings.items()]
+        parts += [f"{name} {value:.2f}" if isinstance(value, float) else f"{name} {value}"
+                  for name, value in self.counters.items()]
+        return " | ".join(parts)
+
+
+class NullMetrics:
+    """Does nothing; used when no metrics are requested (keeps the hot path cheap)."""
+    _null = nullcontext()
+
+    def stage(self, name):
+        return self._null
+
+    def count(self, name, value):
+        pass
+
+    def merge(self, other):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class ProfileCapture:
+    """
+    Opt-in cProfile + tracemalloc capture around a single run.
+
+    with ProfileCapture() as capture:
+        ...
+    print(capture.report())
+    """
+    def __init__(self, cpu=True, memory=True, top=15):
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+        self.profile = None
+        self.peak_bytes = None
+        self.snapshot = None
+
+    def __enter__(self):
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is not None:
+            self.profile.disable()
+        if self.memory:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        return False
+
+    def report(self):
+        out = io.StringIO()
+        if self.profile is not None:
+            out.write(f"--- CPU (top {self.top} by cumulative time) ---\n")
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+        if self.snapshot is not None:
+            out.write(f"--- Memory (peak {self.peak_bytes / 1e6:.1f} MB, top {self.top} allocation sites) ---\n")
+            for stat in self.snapshot.statistics("lineno")[:self.top]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
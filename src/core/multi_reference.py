@@ -0,0 +1,239 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.core.batch_inspector import collect_test_images
+from src.core.metrics import InspectionMetrics, NULL_METRICS
+from src.core.recipe import resolve_recipe
+
+
+def thumbnail_descriptor(gray, size=32):
+    """
+    Global descriptor of a grayscale image: a size x size area-averaged thumbnail,
+    zero-mean and unit-norm, so the dot product of two descriptors is their
+    normalized cross-correlation (1 = same board, ~0 = unrelated).
+    """
+    thumb = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    thumb -= thumb.mean()
+    norm = np.linalg.norm(thumb)
+    return thumb / norm if norm > 0 else thumb
+
+
+class ReferenceIndex:
+    """
+    Thumbnail index of a set of golden samples.
+
+    Ranking a test image against every reference is one matrix-vector product,
+    so the index stays cheap with many references. Entries are keyed by path,
+    mtime and size; changed files are re-indexed on the next refresh().
+    """
+    def __init__(self, reference_store, thumb_size=32):
+        self.reference_store = reference_store
+        self.thumb_size = thumb_size
+        self.paths = []
+        self._keys = {}
+        self._matrix = np.zeros((0, thumb_size * thumb_size), np.float32)
+        self._lock = threading.Lock()
+
+    def _key(self, path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self, paths):
+        """(Re)indexes the given references; unchanged ones are not decoded again."""
+        paths = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            rows = {path: row for path, row in zip(self.paths, self._matrix)}
+        keys = {}
+        for path in paths:
+            key = self._key(path)
+            if self._keys.get(path) != key or path not in rows:
+                gray = cv2.cvtColor(self.reference_store.load(path), cv2.COLOR_BGR2GRAY)
+                rows[path] = thumbnail_descriptor(gray, self.thumb_size)
+            keys[path] = key
+
+        with self._lock:
+            self.paths = paths
+            self._keys = keys
+            self._matrix = np.stack([rows[p] for p in paths]) if paths else self._matrix[:0]
+
+    def descriptor(self, path):
+        # Read both under the lock: refresh() may swap them while candidates are aligned
+        with self._lock:
+            paths, matrix = self.paths, self._matrix
+        return matrix[paths.index(os.path.abspath(path))]
+
+    def rank(self, gray_test):
+        """[(path, score), ...] best first (score = thumbnail correlation in [-1, 1])."""
+        with self._lock:
+            paths, matrix = self.paths, self._matrix
+        scores = matrix @ thumbnail_descriptor(gray_test, self.thumb_size)
+        order = np.argsort(-scores, kind="stable")
+        return [(paths[i], float(scores[i])) for i in order]
+
+    def aligned_score(self, path, gray_test, ref_shape, h_matrix):
+        """Thumbnail correlation after warping the test image with h_matrix (test -> reference)."""
+        # Warp on an 8x thumbnail (cheap on any image size): H_small = S_ref * H * S_test^-1
+        side = 8 * self.thumb_size
+        ref_h, ref_w = ref_shape[:2]
+        test_h, test_w = gray_test.shape[:2]
+        small = cv2.resize(gray_test, (side, side), interpolation=cv2.INTER_AREA)
+        s_test = np.diag([side / test_w, side / test_h, 1.0])
+        s_ref = np.diag([side / ref_w, side / ref_h, 1.0])
+        warped = cv2.warpPerspective(small, s_ref @ h_matrix @ np.linalg.inv(s_test), (side, side))
+        return float(thumbnail_descriptor(warped, self.thumb_size) @ self.descriptor(path))
+
+
+class Candidate:
+    """One reference tried for a test image."""
+    __slots__ = ("path", "prefilter", "aligned", "h_matrix", "info", "metrics")
+
+    def __init__(self, path, prefilter, aligned=None, h_matrix=None, info=None, metrics=None):
+        self.path = path
+        self.prefilter = prefilter      # Thumbnail correlation before alignment
+        self.aligned = aligned          # ... after alignment (None if registration failed)
+        self.h_matrix = h_matrix
+        self.info = info
+        self.metrics = metrics
+
+    @property
+    def score(self):
+        return max(self.prefilter, self.aligned if self.aligned is not None else -1.0)
+
+    def to_dict(self):
+        return {"reference": self.path, "prefilter": self.prefilter, "aligned": self.aligned,
+                "inliers": self.info["inliers"] if self.info else None}
+
+
+class MultiReferenceInspector:
+    """
+    Inspects a test board against a set of golden samples, picking the reference automatically.
+
+    1. Prefilter: rank all references by thumbnail correlation (one matmul).
+    2. Fully align only the top_k candidates scoring within margin of the best,
+       concurrently on threads (OpenCV releases the GIL); the test image's ORB
+       features are detected once and shared by all candidates.
+    3. Keep the candidate whose aligned thumbnail correlates best with its
+       reference, then warp and detect against it.
+
+    When the best prefilter score is far ahead (the usual case on a line with
+    distinct products), only one reference is aligned.
+    """
+    # Registration that lowers the correlation by more than this is rejected (board already in place)
+    ALIGN_TOLERANCE = 0.1
+    def __init__(self, processor, references, top_k=3, margin=0.15, max_workers=None):
+        """
+        Args:
+            processor (ImageProcessor): Shared processor (its reference store and caches are reused).
+            references (str | list): Directory / glob of reference images, or a list of paths.
+            top_k (int): Most references fully aligned per test image.
+            margin (float): Candidates must score within this of the best prefilter score.
+        """
+        self.processor = processor
+        self.top_k = top_k
+        self.margin = margin
+        self.max_workers = max_workers or top_k
+        self.references = references
+        self.index = ReferenceIndex(processor.reference_store)
+        self.refresh()
+
+    def refresh(self):
+        """Re-scans the reference set (call after adding or replacing golden samples)."""
+        if isinstance(self.references, str):
+            paths = collect_test_images(self.references)
+        else:
+            paths = list(self.references)
+        if not paths:
+            raise FileNotFoundError(f"ERROR: No reference images in -> {self.references}")
+        self.index.refresh(paths)
+
+    def select(self, img_test, metrics=None):
+        """
+        Ranks and aligns the candidate references, each with its own recipe.
+
+        Returns:
+            list: Aligned candidates best first (registered ones ahead of failed ones); pass to warp().
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+
+        features = self.processor.test_features(img_test, metrics)
+        gray_test = features[0]
+        with metrics.stage("prefilter"):
+            ranked = self.index.rank(gray_test)
+        best = ranked[0][1]
+        candidates = [Candidate(path, score) for path, score in ranked[:self.top_k] if score >= best - self.margin]
+        metrics.count("candidates", len(candidates))
+
+        # Each reference registers with its own recipe; test features are detected once per ORB setting
+        processors = {c.path: self.processor.with_recipe(resolve_recipe(ref_path=c.path)) for c in candidates}
+        test_features = {self.processor.recipe.nfeatures: features}
+        for processor in processors.values():
+            if processor.recipe.nfeatures not in test_features:
+                test_features[processor.recipe.nfeatures] = processor.test_features(img_test)
+
+        def align(candidate):
+            candidate.metrics = InspectionMetrics()
+            processor = processors[candidate.path]
+            img_ref = processor.load_reference(candidate.path)
+            h_matrix, info = processor.estimate_homography(
+                img_test, img_ref, candidate.path, candidate.metrics,
+                test_features=test_features[processor.recipe.nfeatures])
+            if h_matrix is not None:
+                candidate.h_matrix, candidate.info = h_matrix, info
+                candidate.aligned = self.index.aligned_score(candidate.path, gray_test, img_ref.shape, h_matrix)
+            return candidate
+
+        with metrics.stage("align_candidates"):
+            if len(candidates) == 1:
+                align(candidates[0])
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(candidates))) as pool:
+                    list(pool.map(align, candidates))
+
+        # A failed registration only has its prefilter score and must not outrank a registered reference
+        candidates.sort(key=lambda c: (c.aligned is not None, c.score), reverse=True)
+        return candidates
+
+    def warp(self, img_test, candidates, metrics=None):
+        """
+        Applies the registration of the best usable candidate.
+
+        The first candidate is used if its registration holds, or as is when
+        the board is already in place; otherwise the next registered one.
+
+        Returns:
+            tuple: (chosen Candidate, reference image, aligned test image).
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+        for i, candidate in enumerate(candidates):
+            img_ref = self.processor.load_reference(candidate.path)
+            height, width = img_ref.shape[:2]
+            registered = (candidate.aligned is not None
+                          and candidate.aligned >= candidate.prefilter - self.ALIGN_TOLERANCE)
+            if registered:
+                # Stored metrics look like a single-reference inspection of the chosen one
+                metrics.merge(candidate.metrics)
+                with metrics.stage("warp"):
+                    return candidate, img_ref, cv2.warpPerspective(img_test, candidate.h_matrix, (width, height))
+            if i == 0 and img_test.shape == img_ref.shape:
+                # Registration failed or made the match clearly worse: the board is already in place
+                metrics.merge(candidate.metrics)
+                return candidate, img_ref, img_test
+        raise ValueError(f"Alignment failed against every candidate reference "
+                         f"({', '.join(c.path for c in candidates)})")
+
+    def inspect(self, img_test, min_area=None, metrics=None):
+        """
+        Selects the reference, warps and detects (with the chosen reference's recipe).
+
+        Returns:
+            tuple: (chosen Candidate, aligned image, DefectResult, all candidates).
+        """
+        candidates = self.select(img_test, metrics)
+        chosen, img_ref, aligned_img = self.warp(img_test, candidates, metrics)
+        processor = self.processor.with_recipe(resolve_recipe(ref_path=chosen.path))
+        result = processor.find_defects(img_ref, aligned_img, min_area, metrics, chosen.path)
+        return chosen, aligned_img, result, candidates
@@ -0,0 +1,134 @@
+import os
+import json
+import dataclasses
+from dataclasses import dataclass
+
+# Directory of named product recipes (<name>.json)
+RECIPE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          "data", "recipes")
+
+
+@dataclass(frozen=True)
+class Recipe:
+    """
+    Inspection parameters of one product / golden sample.
+
+    Immutable and hashable: parsed and validated once, then handed to
+    ImageProcessor (and pickled to worker processes) as is. The defaults are
+    the values the inspection has always used.
+    """
+    name: str = "default"
+    # Alignment
+    nfeatures: int = 5000           # ORB keypoints per image
+    keep_ratio: float = 0.15        # Share of best brute-force matches passed to RANSAC
+    # Detection
+    diff_threshold: int = 50        # Gray-level difference that counts as a defect
+    min_area: float = 50            # Smallest defect area (px)
+    border_margin: int = 10         # Blobs closer than this to the image edge are ignored
+    # Classification
+    copper_intensity: float = 150   # Mean gray above this = missing copper (else excess copper)
+    pinhole_max_area: float = 200   # Missing copper: pin-hole below, mousebite up to mousebite_max_area
+    mousebite_max_area: float = 600  # Missing copper: open above
+    short_min_area: float = 350     # Excess copper: short above, copper below
+
+    def __post_init__(self):
+        checks = [
+            (self.nfeatures > 0, "nfeatures must be > 0"),
+            (0 < self.keep_ratio <= 1, "keep_ratio must be in (0, 1]"),
+            (0 <= self.diff_threshold <= 255, "diff_threshold must be in [0, 255]"),
+            (self.min_area >= 0, "min_area must be >= 0"),
+            (self.border_margin >= 0, "border_margin must be >= 0"),
+            (0 <= self.copper_intensity <= 255, "copper_intensity must be in [0, 255]"),
+            (self.pinhole_max_area <= self.mousebite_max_area, "pinhole_max_area must be <= mousebite_max_area"),
+        ]
+        errors = [message for ok, message in checks if not ok]
+        if errors:
+            raise ValueError(f"Invalid recipe '{self.name}': {'; '.join(errors)}")
+
+    @classmethod
+    def from_dict(cls, data, name=None):
+        """Builds a validated recipe; unknown keys and wrong types are errors (typos must not pass silently)."""
+        fields = {f.name: f for f in dataclasses.fields(cls)}
+        unknown = sorted(set(data) - set(fields))
+        if unknown:
+            raise ValueError(f"Unknown recipe keys: {', '.join(unknown)}")
+
+        values = {}
+        for key, value in data.items():
+            kind = fields[key].type
+            if kind is str:
+                values[key] = str(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Recipe key '{key}' must be a number, got {value!r}")
+            elif kind is int:
+                if value != int(value):
+                    raise ValueError(f"Recipe key '{key}' must be an integer, got {value!r}")
+                values[key] = int(value)
+            else:
+                values[key] = float(value)
+        if name is not None and "name" not in values:
+            values["name"] = name
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a recipe JSON file (missing keys keep their defaults)."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_dict(data, name=os.path.splitext(os.path.basename(path))[0])
+
+    def replace(self, **changes):
+        """A validated copy with some parameters changed."""
+        return Recipe.from_dict(dict(self.to_dict(), **changes))
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+    def parameters(self):
+        """This recipe without its name: equal for recipes that inspect identically."""
+        return dataclasses.replace(self, name="")
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+DEFAULT_RECIPE = Recipe()
+
+# Parsed recipe files, keyed by (path, mtime): each file version is parsed once per process
+_loaded = {}
+
+
+def load_recipe(path):
+    """Recipe.load with a per-process cache (edited files are re-read)."""
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    recipe = _loaded.get(key)
+    if recipe is None:
+        recipe = _loaded[key] = Recipe.load(path)
+    return recipe
+
+
+def recipe_path_for_reference(ref_path):
+    """Per-reference recipe sidecar, e.g. ref.jpg -> ref.jpg.recipe.json."""
+    return f"{ref_path}.recipe.json"
+
+
+def resolve_recipe(recipe=None, ref_path=None):
+    """
+    Finds the recipe to use for an inspection.
+
+    Args:
+        recipe (str | Recipe): A Recipe, a recipe file path or a name in data/recipes.
+            None = the reference's .recipe.json sidecar if there is one, else the defaults.
+        ref_path (str): Reference image (for the sidecar lookup).
+    """
+    if isinstance(recipe, Recipe):
+        return recipe
+    if recipe:
+        path = recipe if os.path.exists(recipe) else os.path.join(RECIPE_DIR, f"{recipe}.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Recipe not found: {recipe}")
+        return load_recipe(path)
+    if ref_path is not None and os.path.exists(recipe_path_for_reference(ref_path)):
+        return load_recipe(recipe_path_for_reference(ref_path))
+    return DEFAULT_RECIPE
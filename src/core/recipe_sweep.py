@@ -0,0 +1,118 @@
+import itertools
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from src.core.image_processor import ImageProcessor
+from src.core.batch_inspector import inspect_pair
+from src.core.reference_store import ReferenceStore
+from src.core.compiled_reference import CompiledReferenceCache
+
+# One base processor per worker process; per-recipe siblings share its caches
+_sweep_processor = None
+
+
+def _init_sweep_worker(processor_options, n_recipes):
+    global _sweep_processor
+    # Each process already runs on its own core; avoid oversubscribing with OpenCV threads
+    cv2.setNumThreads(1)
+    # The whole grid is replayed per image: keep every recipe (and its compiled reference) warm
+    _sweep_processor = ImageProcessor(max_recipes=n_recipes,
+                                      compiled_references=CompiledReferenceCache(max(8, n_recipes)),
+                                      **processor_options)
+
+
+def _sweep_one(job):
+    """Inspects one image under one recipe. Runs inside a worker process."""
+    recipe, ref_path, test_path = job
+    processor = (_sweep_processor or ImageProcessor()).with_recipe(recipe)
+    start = time.perf_counter()
+    result = inspect_pair(processor, ref_path, test_path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return recipe, result["filename"], result["defect_count"], result["error"], elapsed_ms
+
+
+def parse_grid(specs):
+    """
+    ["diff_threshold=40,50,60", "min_area=30,50"] -> {"diff_threshold": [40, 50, 60], "min_area": [30, 50]}.
+    """
+    grid = {}
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Expected key=v1,v2,... but got '{spec}'")
+        grid[key.strip()] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def expand_grid(base, grid):
+    """
+    Every combination of the grid values applied to the base recipe (validated, named after
+    the changes). Combinations with the same parameters run once; one equal to the base
+    recipe is the base recipe itself.
+    """
+    keys = list(grid)
+    recipes = {}
+    for values in itertools.product(*(grid[k] for k in keys)):
+        changes = dict(zip(keys, values))
+        name = " ".join(f"{k}={v:g}" for k, v in changes.items()) or base.name
+        recipe = base.replace(name=name, **changes)
+        if recipe.parameters() == base.parameters():
+            recipe = base
+        recipes.setdefault(recipe.parameters(), recipe)    # Keep the first name, in order
+    return list(recipes.values())
+
+
+class RecipeSweep:
+    """
+    Replays a stored image set under many recipes in parallel.
+
+    Every (recipe, image) pair is one job in a process pool; inside a worker
+    the reference features are shared by all recipes with the same feature
+    count, so only the parameters that change cost extra time.
+    """
+    def __init__(self, max_workers=None, processor_options=None):
+        self.max_workers = max_workers
+        self.processor_options = processor_options or {}
+
+    def run(self, ref_path, test_paths, recipes):
+        """
+        Returns:
+            dict: recipe -> {filename: (defect_count, error, ms)}.
+        """
+        # Decode the reference once up front; every worker maps the same raw file
+        ReferenceStore().load(ref_path)
+
+        # Image-major order: every recipe sees the same mix of images while the pool is busy
+        jobs = [(recipe, ref_path, path) for path in test_paths for recipe in recipes]
+        results = {recipe: {} for recipe in recipes}
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_sweep_worker,
+                                 initargs=(self.processor_options, len(recipes))) as pool:
+            for recipe, filename, count, error, ms in pool.map(_sweep_one, jobs, chunksize=4):
+                results[recipe][filename] = (count, error, ms)
+        return results
+
+
+def score(per_image, truth):
+    """
+    Speed and accuracy of one recipe.
+
+    Args:
+        per_image (dict): filename -> (defect_count, error, ms) from RecipeSweep.run.
+        truth (dict): filename -> expected defect count.
+
+    Returns:
+        dict: pass_fail_accuracy (share of images with the expected PASS/FAIL verdict),
+        count_mae (mean absolute defect count error), mean_ms, errors.
+    """
+    scored = [(count, truth[name]) for name, (count, error, _) in per_image.items()
+              if error is None and name in truth]
+    times = [ms for _, error, ms in per_image.values() if error is None]
+    return {
+        "pass_fail_accuracy": (sum((c == 0) == (t == 0) for c, t in scored) / len(scored)) if scored else None,
+        "count_mae": statistics.mean(abs(c - t) for c, t in scored) if scored else None,
+        "mean_ms": statistics.mean(times) if times else None,
+        "errors": sum(error is not None for _, error, _ in per_image.values()),
+    }
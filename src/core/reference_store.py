@@ -0,0 +1,103 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class ReferenceStore:
+    """
+    Decoded golden samples, stored once as raw .npy files and memory-mapped.
+
+    The first load of a reference decodes it (cv2.imread) and writes the BGR
+    array to cache_dir. Later loads, in this or any other process, map that
+    file read-only, so batch workers share one copy through the OS page cache
+    instead of each decoding the JPEG. File names include the source mtime and
+    size, so editing a reference invalidates its decoded copy automatically.
+    """
+    def __init__(self, cache_dir=None, max_entries=8):
+        # Next to the database by default (current working directory)
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), ".qualiem_cache", "references")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _prefix(self, path):
+        return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+    def raw_path(self, path):
+        """Path of the decoded .npy copy for the current version of the source image."""
+        stat = os.stat(path)
+        return os.path.join(self.cache_dir, f"{self._prefix(path)}_{stat.st_mtime_ns}_{stat.st_size}.npy")
+
+    def load(self, path):
+        """
+        Returns the reference image at path as a read-only (memory-mapped) BGR array.
+
+        Args:
+            path (str): Reference image path.
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"ERROR: Image could not be found at -> {path}")
+
+        raw_path = self.raw_path(path)
+        with self._lock:
+            img = self._entries.get(raw_path)
+            if img is not None:
+                self._entries.move_to_end(raw_path)
+                self.hits += 1
+                return img
+
+            self.misses += 1
+            img = self._map(raw_path)
+            if img is None:
+                self._decode(path, raw_path)
+                img = self._map(raw_path)
+
+            self._entries[raw_path] = img
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return img
+
+    def _map(self, raw_path):
+        if not os.path.exists(raw_path):
+            return None
+        try:
+            return np.load(raw_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"[CACHE] Ignoring corrupt reference file {raw_path}: {e}")
+            return None
+
+    def _decode(self, path, raw_path):
+        img = cv2.imread(path)
+        if img is None:
+            raise FileNotFoundError(f"ERROR: Image could not be found at -> {path}")
+
+        # Write under a temporary name, then rename: other processes never map a partial file
+        tmp_path = f"{raw_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, img)
+        os.replace(tmp_path, raw_path)
+        self._prune(path, raw_path)
+
+    def _prune(self, path, current):
+        """Removes decoded copies of older versions of the same source image."""
+        prefix = self._prefix(path) + "_"
+        for name in os.listdir(self.cache_dir):
+            stale = os.path.join(self.cache_dir, name)
+            if name.startswith(prefix) and name.endswith(".npy") and stale != current:
+                self._entries.pop(stale, None)
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass    # Still mapped elsewhere (Windows); removed on a later prune
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,57 @@
+import os
+from collections import OrderedDict
+
+
+class RegistrationCache:
+    """
+    Last good homography per reference, for fixtured lines where consecutive
+    boards sit in (almost) the same pose.
+
+    ImageProcessor validates the stored homography on each new test image and
+    only falls back to full ORB + RANSAC registration when validation fails.
+    hits / misses show how often the expensive path runs.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(ref_path):
+        return os.path.abspath(ref_path)
+
+    def get(self, ref_path):
+        """Returns (h_matrix, check_points) or None."""
+        key = self.key(ref_path)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, ref_path, h_matrix, check_points):
+        """
+        Stores a freshly computed homography.
+
+        Args:
+            h_matrix (ndarray): Test -> reference homography (full resolution).
+            check_points (ndarray): (N, 2) reference points that matched well (inliers).
+        """
+        self._entries[self.key(ref_path)] = (h_matrix, check_points)
+        self._entries.move_to_end(self.key(ref_path))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, ref_path=None):
+        if ref_path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(self.key(ref_path), None)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
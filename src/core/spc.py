@@ -0,0 +1,51 @@
+import math
+
+
+class RunningStats:
+    """
+    Streaming SPC statistics over defect counts.
+
+    Mean and variance use Welford's algorithm so new results can be added
+    one at a time without revisiting history. The histogram is a plain
+    value -> frequency dict (defect counts are small integers).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0          # Sum of squared differences from the mean
+        self.max = None
+        self.hist = {}
+
+    @classmethod
+    def from_distribution(cls, distribution):
+        """
+        Seeds the statistics from (value, frequency) pairs, e.g. a SQL GROUP BY.
+        """
+        stats = cls()
+        for value, freq in distribution:
+            stats.add(value, freq)
+        return stats
+
+    def add(self, value, freq=1):
+        """Adds value freq times (Chan's parallel update, equal to Welford when freq == 1)."""
+        if freq <= 0:
+            return
+        value = 0 if value is None else value
+
+        new_count = self.count + freq
+        delta = value - self.mean
+        self.mean += delta * freq / new_count
+        self.m2 += delta * delta * self.count * freq / new_count
+        self.count = new_count
+
+        self.max = value if self.max is None else max(self.max, value)
+        self.hist[value] = self.hist.get(value, 0) + freq
+
+    @property
+    def variance(self):
+        # Population variance (same as np.std default)
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
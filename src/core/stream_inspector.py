@@ -0,0 +1,224 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from src.core.image_processor import ImageProcessor
+from src.core.reference_store import ReferenceStore
+from src.core.batch_inspector import IMAGE_EXTENSIONS, inspect_pair
+from src.core.defects import defects_to_records
+from src.core.recipe import resolve_recipe
+
+
+class FolderWatcher:
+    """
+    Polling watcher for a directory that cameras / AOI machines write images into.
+
+    A file is reported once its size and mtime have not changed for settle_time
+    seconds, so images still being written are never picked up half-finished.
+    Each (path, size, mtime) version is reported only once; a file overwritten
+    under the same name is reported again.
+    """
+    def __init__(self, directory, settle_time=0.5, include_existing=False):
+        self.directory = directory
+        self.settle_time = settle_time
+        self._pending = {}      # path -> ((size, mtime_ns), first time seen with that stat)
+        self._seen = {}         # path -> (size, mtime_ns) already reported
+        if not include_existing:
+            for path, stat in self._scan():
+                self._seen[path] = stat
+
+    def _scan(self):
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        found = []
+        for entry in entries:
+            # Hidden / temporary names (".x.jpg", "x.jpg.part") are skipped by the extension check
+            if entry.name.startswith(".") or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue    # Removed between listing and stat
+            if entry.is_file():
+                found.append((entry.path, (st.st_size, st.st_mtime_ns)))
+        return found
+
+    def poll(self):
+        """One directory scan. Returns the paths that became ready since the last call (oldest first)."""
+        now = time.monotonic()
+        ready = []
+        present = set()
+        for path, stat in self._scan():
+            present.add(path)
+            if self._seen.get(path) == stat:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != stat:
+                # New file, or still growing: (re)start its settle timer
+                self._pending[path] = (stat, now)
+            elif now - pending[1] >= self.settle_time and stat[0] > 0:
+                del self._pending[path]
+                self._seen[path] = stat
+                ready.append((stat[1], path))
+
+        # Forget files that were moved away / deleted (keeps memory bounded on long runs)
+        for table in (self._pending, self._seen):
+            for path in [p for p in table if p not in present]:
+                del table[path]
+        return [path for _, path in sorted(ready)]
+
+
+class ThroughputMeter:
+    """Thread-safe completion counter with a sliding-window rate (images per second)."""
+    def __init__(self, window=10.0):
+        self.window = window
+        self.done = 0
+        self.failed = 0
+        self._times = deque()
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+
+    def record(self, ok=True):
+        now = time.monotonic()
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+            self._times.append(now)
+            while self._times and now - self._times[0] > self.window:
+                self._times.popleft()
+
+    def rate(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._times and now - self._times[0] > self.window:
+                self._times.popleft()
+            span = min(self.window, now - self._start)
+            return len(self._times) / span if span > 0 else 0.0
+
+
+class StreamInspector:
+    """
+    Unattended inspection of a folder that is continuously filled with images.
+
+    watcher thread -> bounded queue -> worker threads (align + detect) -> DB writer thread
+
+    When the workers cannot keep up, the queue fills and the watcher stops
+    scanning (backpressure): new images simply wait on disk instead of piling
+    up in memory. Results are written to the database in batches of up to
+    batch_size rows, or every flush_interval seconds, whichever comes first.
+    """
+    def __init__(self, ref_path, directory, db=None, workers=None, queue_size=32, batch_size=50,
+                 flush_interval=1.0, poll_interval=0.2, settle_time=0.5, include_existing=False,
+                 processor_options=None, on_result=None, recipe=None):
+        self.ref_path = ref_path
+        self.db = db
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        # ImageProcessor keyword arguments for every worker (e.g. align_scale)
+        self.processor_options = processor_options or {}
+        # Called from a worker thread with each result dict (see batch_inspector.inspect_pair)
+        self.on_result = on_result
+        # Recipe, recipe file or name (None = the reference's .recipe.json or the defaults)
+        self.recipe = resolve_recipe(recipe, ref_path)
+
+        self.watcher = FolderWatcher(directory, settle_time, include_existing)
+        self.meter = ThroughputMeter()
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def queued(self):
+        return self.jobs.qsize()
+
+    def start(self):
+        # OpenCV's own thread pool would compete with our worker threads
+        cv2.setNumThreads(1)
+        # Decode the reference once; all workers share the memory-mapped copy
+        store = ReferenceStore()
+        store.load(self.ref_path)
+
+        self._threads = [threading.Thread(target=self._watch, name="watcher", daemon=True),
+                         threading.Thread(target=self._write, name="db-writer", daemon=True)]
+        for i in range(self.workers):
+            # One processor per thread: matchers and pose caches are not shared between threads
+            processor = ImageProcessor(reference_store=store, recipe=self.recipe, **self.processor_options)
+            self._threads.append(threading.Thread(target=self._work, args=(processor,),
+                                                  name=f"inspector-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops watching, finishes the queued images and flushes the remaining results."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # --- Threads ---
+    def _watch(self):
+        while not self._stop.is_set():
+            for path in self.watcher.poll():
+                # Blocks while the queue is full (backpressure); re-checks stop regularly
+                while not self._stop.is_set():
+                    try:
+                        self.jobs.put(path, timeout=0.2)
+                        break
+                    except queue.Full:
+                        continue
+            self._stop.wait(self.poll_interval)
+
+    def _work(self, processor):
+        while True:
+            try:
+                path = self.jobs.get(timeout=0.2)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            result = inspect_pair(processor, self.ref_path, path)
+            self.meter.record(result["error"] is None)
+            self.results.put(result)
+            if self.on_result is not None:
+                self.on_result(result)
+
+    def _write(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            workers_done = self._stop.is_set() and not any(
+                t.is_alive() for t in self._threads if t.name.startswith("inspector"))
+            try:
+                result = self.results.get(timeout=max(0.0, min(0.2, deadline - time.monotonic())))
+                if result["error"] is None:
+                    batch.append((result["filename"], result["defect_count"],
+                                  defects_to_records(result["defects"]), result["metrics"]))
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+            if workers_done and self.results.empty():
+                self._flush(batch)
+                if self.db is not None:
+                    self.db.close()
+                return
+
+    def _flush(self, batch):
+        if batch and self.db is not None:
+            self.db.add_logs_many(batch)
@@ -0,0 +1,310 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.core.defects import DefectResult
+from src.core.image_processor import contour_points, measure_blobs
+
+
+class TiledDetector:
+    """
+    Memory-bounded defect detection for very large panel images.
+
+    The reference frame is cut into tile_size x tile_size tiles. For each
+    tile, only that window of the test image is warped (with the homography
+    from ImageProcessor.estimate_homography) and differenced, so no
+    full-size warped / diff / threshold images are ever allocated. Tiles are
+    processed on a thread pool (OpenCV releases the GIL) and blobs that cross
+    tile seams are merged afterwards.
+
+    Each tile is processed with an overlap halo so morphology and contour
+    measurements at the seams match the untiled result. Hole filling is
+    global: background regions are linked across seams (4-connectivity, as
+    in fill_holes), and a region is a hole when no part of it reaches the
+    image border. Tiles holding a piece of a hole cut by a seam (and their
+    neighbours, whose edge pixels touch it) are processed a second time with
+    that hole filled, so blobs of any size, and the blobs nested in them,
+    come out exactly as in the untiled find_defects.
+    """
+    def __init__(self, processor, tile_size=2048, overlap=16, workers=None):
+        self.processor = processor
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers or os.cpu_count() or 1
+
+    def tiles(self, width, height):
+        """Core tile rectangles (x0, y0, x1, y1) as a grid (list of rows)."""
+        step = self.tile_size
+        return [[(x, y, min(x + step, width), min(y + step, height)) for x in range(0, width, step)]
+                for y in range(0, height, step)]
+
+    def find_defects(self, img_ref, img_test, h_matrix, min_area=None, ref_path=None):
+        """
+        Returns a DefectResult in reference coordinates (thresh and image are None;
+        use result.render(image) to draw on an image of your choice).
+        """
+        height, width = img_ref.shape[:2]
+        grid = self.tiles(width, height)
+        flat = [rect for row in grid for rect in row]
+        # Gray reference, don't-care mask and region thresholds (compiled once per golden sample)
+        reference = self.processor.compile_reference(img_ref, ref_path)
+
+        def run(index, holes=None):
+            return self._process_tile(reference, img_test, h_matrix, flat[index], holes)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(run, range(len(flat))))
+
+            # Holes cut by a seam: fill them in every tile they touch (and that tile's neighbours)
+            self._seam_holes(grid, results, width, height)
+            redo = sorted(self._neighbourhood(grid, [i for i, r in enumerate(results) if r["cut"]]))
+            second = list(pool.map(lambda i: run(i, self._tile_holes(grid, results, i)), redo))
+            for index, blobs in zip(redo, second):
+                results[index] = blobs
+
+        blobs = self._merge(grid, results)
+        defects = self.processor.build_defects(blobs, width, height, min_area)
+        return DefectResult(defects, None, None)
+
+    def _process_tile(self, reference, img_test, h_matrix, rect, holes=None):
+        """
+        Difference pipeline and blob measurement on one tile (plus halo) of the reference frame.
+
+        Args:
+            holes (tuple): (hole flag per background label of this tile, ring of hole
+                pixels around it) from _tile_holes, or None to fill only the holes
+                enclosed by the tile itself.
+        """
+        x0, y0, x1, y1 = rect
+        height, width = reference.shape
+        ov = self.overlap
+
+        # Window plus halo, clipped to the image
+        hx0, hy0 = max(0, x0 - ov), max(0, y0 - ov)
+        hx1, hy1 = min(width, x1 + ov), min(height, y1 + ov)
+
+        halo = reference.window(slice(hy0, hy1), slice(hx0, hx1))
+
+        # Warp only this window of the test image
+        shift = np.array([[1, 0, -hx0], [0, 1, -hy0], [0, 0, 1]], dtype=np.float64)
+        warped = cv2.warpPerspective(img_test, shift @ h_matrix, (hx1 - hx0, hy1 - hy0))
+        gray_test = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+        del warped
+
+        thresh = self.processor.difference_mask(halo.gray, gray_test, halo)
+        cx0, cy0 = x0 - hx0, y0 - hy0
+        core = thresh[cy0:cy0 + y1 - y0, cx0:cx0 + x1 - x0]
+
+        # Background regions of the tile (4-connectivity, like the flood fill in fill_holes)
+        n_bg, background = cv2.connectedComponents((core == 0).astype(np.uint8), connectivity=4)
+        seams = {
+            "top": background[0, :].copy(), "bottom": background[-1, :].copy(),
+            "left": background[:, 0].copy(), "right": background[:, -1].copy(),
+        }
+        if holes is None:
+            is_hole = np.ones(n_bg, bool)
+            is_hole[0] = False              # Label 0 is the foreground
+            for labels in seams.values():
+                is_hole[labels] = False     # Open to a neighbour tile: treated as outside
+            ring = None
+        else:
+            # Same window as the first pass, so the background labels are the same
+            is_hole, ring = holes
+        filled = np.where(is_hole[background], np.uint8(255), core)
+        del background
+
+        # Contour points need one pixel of the neighbours: their thresh from the halo
+        # plus the ring of filled holes; outside the image is background, as untiled
+        h, w = filled.shape
+        padded = cv2.copyMakeBorder(filled, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        ty0, tx0 = max(cy0 - 1, 0), max(cx0 - 1, 0)
+        ty1, tx1 = min(cy0 + h + 1, thresh.shape[0]), min(cx0 + w + 1, thresh.shape[1])
+        padded[ty0 - cy0 + 1:ty1 - cy0 + 1, tx0 - cx0 + 1:tx1 - cx0 + 1] = thresh[ty0:ty1, tx0:tx1]
+        padded[1:-1, 1:-1] = filled
+        if ring is not None:
+            padded[ring] = 255
+        points = contour_points(filled, padded)
+
+        blobs = measure_blobs(filled, points, gray_test[cy0:cy0 + h, cx0:cx0 + w])
+        labels = blobs.pop("labels")
+        blobs["x"] = blobs["x"] + x0
+        blobs["y"] = blobs["y"] + y0
+
+        # Label ids along the four core edges, for seam merging
+        blobs["seams"] = {
+            "top": labels[0, :].copy(), "bottom": labels[-1, :].copy(),
+            "left": labels[:, 0].copy(), "right": labels[:, -1].copy(),
+        }
+        blobs["background"] = seams
+        blobs["n_background"] = n_bg
+        return blobs
+
+    @staticmethod
+    def _seam_holes(grid, results, width, height):
+        """
+        Links background regions across seams and decides which are holes of the whole image.
+
+        Sets results[i]["holes"] (bool per background label, index 0 unused) and
+        results[i]["cut"] (the tile holds a piece of a hole that touches a seam).
+        """
+        n_cols = len(grid[0])
+        offsets = np.cumsum([0] + [r["n_background"] - 1 for r in results])
+        parent = _link_seams(grid, [r["background"] for r in results], offsets, diagonal=False)
+        roots = np.array([_find(parent, i) for i in range(int(offsets[-1]))], dtype=np.int64)
+
+        # Regions reaching the image border are outside, and so is everything linked to them
+        outside = np.zeros(len(roots), bool)
+        for index, r in enumerate(results):
+            x0, y0, x1, y1 = grid[index // n_cols][index % n_cols]
+            for on_border, side in ((x0 == 0, "left"), (y0 == 0, "top"),
+                                    (x1 == width, "right"), (y1 == height, "bottom")):
+                labels = r["background"][side]
+                if on_border:
+                    outside[roots[offsets[index] + labels[labels > 0] - 1]] = True
+
+        for index, r in enumerate(results):
+            # Regions not touching the tile edge are enclosed by the tile itself
+            is_hole = np.ones(r["n_background"], bool)
+            is_hole[0] = False
+            cut = False
+            for labels in r["background"].values():
+                labels = labels[labels > 0]
+                hole = ~outside[roots[offsets[index] + labels - 1]]
+                is_hole[labels] = hole
+                cut = cut or bool(hole.any())
+            r["holes"], r["cut"] = is_hole, cut
+
+    @staticmethod
+    def _neighbourhood(grid, indices):
+        """The given tiles plus their 8 neighbours (flat indices)."""
+        n_rows, n_cols = len(grid), len(grid[0])
+        found = set()
+        for index in indices:
+            row, col = divmod(index, n_cols)
+            for r in range(max(0, row - 1), min(n_rows, row + 2)):
+                for c in range(max(0, col - 1), min(n_cols, col + 2)):
+                    found.add(r * n_cols + c)
+        return found
+
+    @staticmethod
+    def _tile_holes(grid, results, index):
+        """
+        Hole flags of one tile plus the ring of hole pixels just outside it.
+
+        Returns:
+            tuple: (bool per background label, (h + 2, w + 2) bool ring mask).
+        """
+        n_rows, n_cols = len(grid), len(grid[0])
+        row, col = divmod(index, n_cols)
+        x0, y0, x1, y1 = grid[row][col]
+        ring = np.zeros((y1 - y0 + 2, x1 - x0 + 2), bool)
+
+        def edge(r, c, side):
+            # Hole flags along one edge of a neighbour tile (empty outside the grid)
+            if not (0 <= r < n_rows and 0 <= c < n_cols):
+                return None
+            neighbour = results[r * n_cols + c]
+            return neighbour["holes"][neighbour["background"][side]]
+
+        for target, r, c, side, part in (
+                ((0, slice(1, -1)), row - 1, col, "bottom", slice(None)),
+                ((-1, slice(1, -1)), row + 1, col, "top", slice(None)),
+                ((slice(1, -1), 0), row, col - 1, "right", slice(None)),
+                ((slice(1, -1), -1), row, col + 1, "left", slice(None)),
+                ((0, 0), row - 1, col - 1, "bottom", -1),
+                ((0, -1), row - 1, col + 1, "bottom", 0),
+                ((-1, 0), row + 1, col - 1, "top", -1),
+                ((-1, -1), row + 1, col + 1, "top", 0)):
+            flags = edge(r, c, side)
+            if flags is not None:
+                ring[target] = flags[part]
+        return results[index]["holes"], ring
+
+    @staticmethod
+    def _merge(grid, results):
+        """Merges blobs touching across tile seams (8-connectivity) and aggregates their stats."""
+        offsets = np.cumsum([0] + [len(r["x"]) for r in results])
+        total = int(offsets[-1])
+        parent = _link_seams(grid, [r["seams"] for r in results], offsets, diagonal=True)
+
+        def cat(key):
+            return np.concatenate([r[key] for r in results]) if total else np.zeros(0, np.int64)
+
+        roots = np.array([_find(parent, i) for i in range(total)], dtype=np.int64)
+        _, group = np.unique(roots, return_inverse=True)
+        n_groups = int(group.max()) + 1 if total else 0
+
+        x, y, w, h = cat("x"), cat("y"), cat("w"), cat("h")
+        x0 = np.full(n_groups, np.iinfo(np.int64).max)
+        y0 = np.full(n_groups, np.iinfo(np.int64).max)
+        x1 = np.zeros(n_groups, np.int64)
+        y1 = np.zeros(n_groups, np.int64)
+        np.minimum.at(x0, group, x)
+        np.minimum.at(y0, group, y)
+        np.maximum.at(x1, group, x + w)
+        np.maximum.at(y1, group, y + h)
+
+        return {
+            "x": x0, "y": y0, "w": x1 - x0, "h": y1 - y0,
+            "pixel_area": np.bincount(group, weights=cat("pixel_area"), minlength=n_groups),
+            "intensity_sum": np.bincount(group, weights=cat("intensity_sum"), minlength=n_groups),
+            "contour_points": np.bincount(group, weights=cat("contour_points"), minlength=n_groups),
+        }
+
+
+def _find(parent, i):
+    """Union-find root of i (with path halving)."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _link_seams(grid, seams, offsets, diagonal):
+    """
+    Union-find over the labels of all tiles, linking labels that touch across seams.
+
+    Args:
+        seams (list): Per tile, label ids along its "top", "bottom", "left" and "right" edges.
+        offsets (array): Global id of each tile's label 1 (label l of tile t is offsets[t] + l - 1).
+        diagonal (bool): 8-connectivity (blobs) instead of 4-connectivity (background).
+
+    Returns:
+        np.ndarray: parent array (resolve with _find).
+    """
+    n_cols = len(grid[0])
+    parent = np.arange(int(offsets[-1]))
+    shifts = (-1, 0, 1) if diagonal else (0,)
+
+    def link(labels_a, offset_a, labels_b, offset_b):
+        # Pixels a[i] and b[j] are neighbours across the seam when |i - j| <= 1 (8-connectivity)
+        for shift in shifts:
+            if shift < 0:
+                a, b = labels_a[-shift:], labels_b[:shift]
+            elif shift > 0:
+                a, b = labels_a[:-shift], labels_b[shift:]
+            else:
+                a, b = labels_a, labels_b
+            both = (a > 0) & (b > 0)
+            for la, lb in set(zip(a[both].tolist(), b[both].tolist())):
+                ra, rb = _find(parent, offset_a + la - 1), _find(parent, offset_b + lb - 1)
+                if ra != rb:
+                    parent[rb] = ra
+
+    for index, edges in enumerate(seams):
+        col = index % n_cols
+        if col + 1 < n_cols:
+            link(edges["right"], offsets[index], seams[index + 1]["left"], offsets[index + 1])
+        if index + n_cols < len(seams):
+            link(edges["bottom"], offsets[index], seams[index + n_cols]["top"], offsets[index + n_cols])
+            if diagonal:
+                # Diagonal neighbours touch only at tile corners
+                if col + 1 < n_cols:
+                    link(edges["bottom"][-1:], offsets[index],
+                         seams[index + n_cols + 1]["top"][:1], offsets[index + n_cols + 1])
+                if col > 0:
+                    link(edges["bottom"][:1], offsets[index],
+                         seams[index + n_cols - 1]["top"][-1:], offsets[index + n_cols - 1])
+    return parent
@@ -0,0 +1,99 @@
+import sys
+import os
+import argparse
+import json
+import statistics
+import threading
+import time
+import http.client
+from urllib.parse import urlsplit, quote
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.batch_inspector import collect_test_images
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the HTTP inspection service (src/service.py).")
+    parser.add_argument("reference", help="Reference image path (as seen by the server)")
+    parser.add_argument("tests", help="Directory or glob pattern of test images")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Service base URL")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel client connections")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests")
+    parser.add_argument("--upload", action="store_true",
+                        help="Send the image bytes instead of paths (measures upload + decode too)")
+    args = parser.parse_args()
+
+    test_paths = [os.path.abspath(p) for p in collect_test_images(args.tests)]
+    if not test_paths:
+        print("No test images found.")
+        return
+    reference = os.path.abspath(args.reference)
+    uploads = {p: open(p, "rb").read() for p in test_paths} if args.upload else {}
+    url = urlsplit(args.url)
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def client():
+        # One keep-alive connection per client thread
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=120)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            path = test_paths[i % len(test_paths)]
+            if args.upload:
+                target, body = f"/inspect?reference={quote(reference)}", uploads[path]
+                headers = {"Content-Type": "application/octet-stream"}
+            else:
+                target, body = "/inspect", json.dumps({"reference": reference, "test": path})
+                headers = {"Content-Type": "application/json"}
+
+            start = time.perf_counter()
+            try:
+                conn.request("POST", target, body, headers)
+                response = conn.getresponse()
+                payload = json.loads(response.read())
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=120)
+                ok, payload = False, {"error": str(e)}
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(payload.get("error"))
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    print(f"{args.requests} requests, {args.concurrency} connections, {wall:.2f}s")
+    print(f"  throughput   {len(latencies) / wall:.1f} req/s")
+    if latencies:
+        latencies.sort()
+        def pct(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        print(f"  latency ms   mean {statistics.mean(latencies) * 1000:.1f} | p50 {pct(0.50):.1f} "
+              f"| p95 {pct(0.95):.1f} | p99 {pct(0.99):.1f} | max {latencies[-1] * 1000:.1f}")
+    if errors:
+        print(f"  errors       {len(errors)} (first: {errors[0]})")
+
+if __name__ == "__main__":
+    main()
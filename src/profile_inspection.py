@@ -0,0 +1,41 @@
+import sys
+import os
+import argparse
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.image_processor import ImageProcessor
+from src.core.metrics import InspectionMetrics, ProfileCapture
+
+def main():
+    parser = argparse.ArgumentParser(description="Profiles a single inspection (stage timings, cProfile, tracemalloc).")
+    parser.add_argument("reference", help="Reference (golden sample) image")
+    parser.add_argument("test", help="Test image")
+    parser.add_argument("--top", type=int, default=15, help="Rows per report section")
+    parser.add_argument("--no-cpu", action="store_true", help="Skip cProfile")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc")
+    args = parser.parse_args()
+
+    processor = ImageProcessor()
+    metrics = InspectionMetrics()
+
+    with ProfileCapture(cpu=not args.no_cpu, memory=not args.no_memory, top=args.top) as capture:
+        with metrics.stage("load"):
+            img_ref = processor.load_reference(args.reference)
+            img_test = processor.load_image(args.test)
+        aligned_img = processor.align_images(img_test, img_ref, ref_path=args.reference, metrics=metrics)
+        result = processor.find_defects(img_ref, aligned_img, metrics=metrics, ref_path=args.reference)
+
+    print(f"{os.path.basename(args.test)}: {result.count} defects")
+    print(f"Stages: {metrics.summary()}")
+    print(capture.report())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import sys
+import os
+import argparse
+import asyncio
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.inspection_service import InspectionService
+from src.core.database import DatabaseManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP inspection service (JSON API for MES integration).")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: local only)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--reference", action="append", default=[],
+                        help="Reference image to keep warm in every worker (repeatable)")
+    parser.add_argument("--align-scale", type=float, default=1.0,
+                        help="Match features on a downscaled image (e.g. 0.25), then refine at full resolution")
+    parser.add_argument("--matcher", choices=["bf", "flann"], default="bf",
+                        help="Feature matcher: cross-checked brute force or FLANN LSH with ratio test")
+    parser.add_argument("--recipe", default=None,
+                        help="Recipe file or name in data/recipes for every request "
+                             "(default: <reference>.recipe.json or built-in)")
+    parser.add_argument("--no-db", action="store_true", help="Do not log results to the database")
+    args = parser.parse_args()
+
+    service = InspectionService(host=args.host, port=args.port, workers=args.workers,
+                                processor_options={"align_scale": args.align_scale, "matcher": args.matcher},
+                                preload=args.reference, db=None if args.no_db else DatabaseManager(),
+                                recipe=args.recipe)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print("[SERVICE] Stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import os
+import argparse
+import json
+import time
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.batch_inspector import collect_test_images
+from src.core.recipe import resolve_recipe
+from src.core.recipe_sweep import RecipeSweep, parse_grid, expand_grid, score
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays an image set under many recipe parameter combinations.")
+    parser.add_argument("reference", help="Reference (golden sample) image")
+    parser.add_argument("tests", help="Directory or glob pattern of test images")
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=V1,V2,...",
+                        help="Recipe parameter values to sweep (repeatable), e.g. --param diff_threshold=40,50,60")
+    parser.add_argument("--recipe", default=None,
+                        help="Base recipe file or name in data/recipes (default: <reference>.recipe.json or built-in)")
+    parser.add_argument("--truth", default=None,
+                        help="JSON {filename: expected defect count}; default: the base recipe's own results")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--align-scale", type=float, default=1.0,
+                        help="Match features on a downscaled image (e.g. 0.25), then refine at full resolution")
+    parser.add_argument("--matcher", choices=["bf", "flann"], default="bf",
+                        help="Feature matcher: cross-checked brute force or FLANN LSH with ratio test")
+    parser.add_argument("--save-best", default=None, help="Write the best recipe to this JSON file")
+    parser.add_argument("--out", default=None, help="Write all per-image results to this JSON file")
+    args = parser.parse_args()
+
+    test_paths = collect_test_images(args.tests)
+    if not test_paths:
+        print("No test images found.")
+        return
+
+    base = resolve_recipe(args.recipe, args.reference)
+    recipes = expand_grid(base, parse_grid(args.param))
+    # A grid point with the base parameters already is the base recipe (see expand_grid)
+    if base.parameters() not in {r.parameters() for r in recipes} and args.truth is None:
+        recipes.insert(0, base)     # Needed as the accuracy reference
+
+    sweep = RecipeSweep(max_workers=args.workers,
+                        processor_options={"align_scale": args.align_scale, "matcher": args.matcher})
+    start = time.perf_counter()
+    results = sweep.run(args.reference, test_paths, recipes)
+    elapsed = time.perf_counter() - start
+    print(f"{len(recipes)} recipes x {len(test_paths)} images in {elapsed:.1f}s "
+          f"({len(recipes) * len(test_paths) / elapsed:.1f} inspections/s)")
+
+    if args.truth:
+        with open(args.truth) as f:
+            truth = json.load(f)
+        print(f"Accuracy against {args.truth}")
+    else:
+        truth = {name: count for name, (count, error, _) in results[base].items() if error is None}
+        print(f"Accuracy = agreement with the base recipe '{base.name}' (pass --truth for labelled data)")
+
+    scores = {recipe: score(results[recipe], truth) for recipe in recipes}
+    # Best first: most correct verdicts, then closest counts, then fastest
+    ranked = sorted(recipes, key=lambda r: (-(scores[r]["pass_fail_accuracy"] or 0),
+                                            scores[r]["count_mae"] if scores[r]["count_mae"] is not None else 1e9,
+                                            scores[r]["mean_ms"] or 1e9))
+
+    print(f"\n  {'recipe':<40} {'pass/fail':>9} {'count MAE':>9} {'ms/img':>8} {'errors':>6}")
+    for recipe in ranked:
+        s = scores[recipe]
+        accuracy = f"{s['pass_fail_accuracy']:.0%}" if s["pass_fail_accuracy"] is not None else "-"
+        mae = f"{s['count_mae']:.2f}" if s["count_mae"] is not None else "-"
+        ms = f"{s['mean_ms']:.1f}" if s["mean_ms"] is not None else "-"
+        print(f"  {recipe.name[:40]:<40} {accuracy:>9} {mae:>9} {ms:>8} {s['errors']:>6}")
+
+    if args.save_best:
+        ranked[0].save(args.save_best)
+        print(f"\nBest recipe saved to {args.save_best}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump([{"recipe": recipe.to_dict(), "score": scores[recipe],
+                        "images": {name: {"defect_count": count, "error": error, "ms": ms}
+                                   for name, (count, error, ms) in results[recipe].items()}}
+                       for recipe in ranked], f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
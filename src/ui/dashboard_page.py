@@ -1,17 +1,13 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QFrame, QSizePolicy)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from src.core.database import DatabaseManager
 
-# Graphics Lib
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-
 class DashboardPage(QWidget):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
-        self.db = DatabaseManager()
+        # Shared with the other pages when created by MainWindow
+        self.db = db if db is not None else DatabaseManager()
         self.chart_container = None # Layout
         self.init_ui()
 
@@ -52,8 +48,8 @@ class DashboardPage(QWidget):
         
         layout.addWidget(chart_frame, stretch=1) 
         
-        # Load data on first startup.
-        self.refresh_stats()
+        # Load data on first startup (after the window is shown: matplotlib is imported then)
+        QTimer.singleShot(0, self.refresh_stats)
 
     def create_card(self, title, value, color):
         """ creates flashcards"""
@@ -83,7 +79,9 @@ class DashboardPage(QWidget):
         return card
 
     def create_pie_chart(self, pass_count, fail_count):
-       
+        # Graphics Lib (imported on first use, keeps startup fast)
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
         
         # 1.Figure Settings
         fig = Figure(figsize=(5, 4), dpi=100)
@@ -127,19 +125,19 @@ class DashboardPage(QWidget):
 
     def refresh_stats(self):
         
-        logs = self.db.get_all_logs()
+        # Aggregated in SQL (summary table), no need to fetch every row
+        summary = self.db.get_summary()
         
-        total = len(logs)
-        defects = sum([row[3] for row in logs])
+        total = summary["total"]
+        defects = summary["total_defects"]
+        pass_count = summary["pass_count"]
         
-        pass_count = 0
         if total > 0:
-            pass_count = len([row for row in logs if row[4] == "PASS"])
             pass_rate = int((pass_count / total) * 100)
         else:
             pass_rate = 0
             
-        fail_count = total - pass_count
+        fail_count = summary["fail_count"]
 
         # Update Cards
         self.card_total.value_label.setText(str(total))
@@ -0,0 +1,80 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+
+class LogTableModel(QAbstractTableModel):
+    """
+    Lazily loaded table model over the logs table.
+
+    Rows are fetched from SQL one page at a time (keyset pagination on id)
+    as the view scrolls, so only what the user actually looks at is loaded.
+    Filters are applied in the SQL query.
+    """
+    HEADERS = ["ID", "Timestamp", "Filename", "Defects", "Status"]
+    PAGE_SIZE = 500
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.rows = []
+        self.filters = {}
+        self.exhausted = False
+
+    # --- Filtering / reloading ---
+    def set_filters(self, filename=None, status=None, since=None, until=None):
+        self.filters = {"filename": filename, "status": status, "since": since, "until": until}
+        self.refresh()
+
+    def refresh(self):
+        """Drops loaded rows and fetches the first page again."""
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    # --- Lazy fetching ---
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        before_id = self.rows[-1][0] if self.rows else None
+        page = self.db.get_logs_page(before_id=before_id, limit=self.PAGE_SIZE, **self.filters)
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    # --- Model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        # Status
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 4:
+            return QColor(Qt.GlobalColor.green) if value == "PASS" else QColor(Qt.GlobalColor.red)
+        return None
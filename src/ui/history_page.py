@@ -1,41 +1,73 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, 
-                             QHeaderView, QPushButton, QLabel, QHBoxLayout)
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableView, QHeaderView, QPushButton, QLabel,
+                             QHBoxLayout, QLineEdit, QComboBox, QCheckBox, QDateEdit)
+from PyQt6.QtCore import QDate
 from src.core.database import DatabaseManager
+from src.ui.history_model import LogTableModel
 
 class HistoryPage(QWidget):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
-        self.db = DatabaseManager()
+        # Shared with the other pages when created by MainWindow
+        self.db = db if db is not None else DatabaseManager()
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout(self)
-        
+
         # --- HEADER ---
         header_layout = QHBoxLayout()
         title = QLabel("📋 Inspection History Logs")
         title.setStyleSheet("font-size: 20px; font-weight: bold; color: #ddd;")
-        
+
         self.btn_refresh = QPushButton("🔄 Refresh Data")
         self.btn_refresh.setFixedWidth(120)
         self.btn_refresh.setStyleSheet("background-color: #007acc; color: white; font-weight: bold;")
         self.btn_refresh.clicked.connect(self.load_data)
-        
+
         header_layout.addWidget(title)
         header_layout.addStretch()
         header_layout.addWidget(self.btn_refresh)
-        
+
         layout.addLayout(header_layout)
 
+        # --- FILTERS (applied in SQL) ---
+        filter_layout = QHBoxLayout()
+
+        self.txt_filename = QLineEdit()
+        self.txt_filename.setPlaceholderText("Filename contains...")
+        self.txt_filename.returnPressed.connect(self.load_data)
+
+        self.cmb_status = QComboBox()
+        self.cmb_status.addItems(["All", "PASS", "FAIL"])
+        self.cmb_status.currentIndexChanged.connect(self.load_data)
+
+        self.chk_date = QCheckBox("Date:")
+        self.chk_date.toggled.connect(self.load_data)
+        self.date_from = QDateEdit(QDate.currentDate().addDays(-7))
+        self.date_from.setCalendarPopup(True)
+        self.date_to = QDateEdit(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        self.date_from.dateChanged.connect(self.on_date_changed)
+        self.date_to.dateChanged.connect(self.on_date_changed)
+
+        filter_layout.addWidget(self.txt_filename, stretch=1)
+        filter_layout.addWidget(self.cmb_status)
+        filter_layout.addWidget(self.chk_date)
+        filter_layout.addWidget(self.date_from)
+        filter_layout.addWidget(QLabel("→"))
+        filter_layout.addWidget(self.date_to)
+
+        layout.addLayout(filter_layout)
+
         # --- TABLE ---
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "Timestamp", "Filename", "Defects", "Status"])
-        
+        self.model = LogTableModel(self.db, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+
         # Table Design
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #252526;
                 color: #ddd;
                 gridline-color: #444;
@@ -48,33 +80,28 @@ class HistoryPage(QWidget):
                 border: 1px solid #444;
             }
         """)
-        
-        
+
+
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        
+
         layout.addWidget(self.table)
-        
+
         #load data
         self.load_data()
 
+    def on_date_changed(self):
+        if self.chk_date.isChecked():
+            self.load_data()
+
     def load_data(self):
-        """Fetches data from DB and populates the table."""
-        logs = self.db.get_all_logs()
-        self.table.setRowCount(0) # clean table
-        
-        for row_idx, row_data in enumerate(logs):
-            self.table.insertRow(row_idx)
-            # row_data format: (id, timestamp, filename, count, status)
-            
-            for col_idx, data in enumerate(row_data):
-                item = QTableWidgetItem(str(data))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                # Status 
-                if col_idx == 4: # Status
-                    if data == "PASS":
-                        item.setForeground(Qt.GlobalColor.green)
-                    else:
-                        item.setForeground(Qt.GlobalColor.red)
-                
-                self.table.setItem(row_idx, col_idx, item)
\ No newline at end of file
+        """Reloads the first page of logs with the current filters."""
+        status = self.cmb_status.currentText()
+        since = until = None
+        if self.chk_date.isChecked():
+            since = self.date_from.date().toString("yyyy-MM-dd")
+            # until is exclusive: include the whole "to" day
+            until = self.date_to.date().addDays(1).toString("yyyy-MM-dd")
+
+        self.model.set_filters(filename=self.txt_filename.text().strip() or None,
+                               status=None if status == "All" else status,
+                               since=since, until=until)
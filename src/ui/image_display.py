@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QImage, QPixmap, QPainter, QPen, QColor
+
+from src.core.defects import DEFECT_CLASSES
+
+
+def to_qimage(cv_img):
+    """
+    Wraps an OpenCV image (BGR or grayscale) in a QImage without a color-conversion copy.
+
+    The QImage shares the array's memory: keep cv_img alive while the QImage is
+    in use (QPixmap.fromImage makes its own copy, after which it can go).
+    """
+    cv_img = np.ascontiguousarray(cv_img)
+    h, w = cv_img.shape[:2]
+    if cv_img.ndim == 2:
+        fmt = QImage.Format.Format_Grayscale8
+    else:
+        fmt = QImage.Format.Format_BGR888
+    q_img = QImage(cv_img.data, w, h, cv_img.strides[0], fmt)
+    # Ties the buffer's lifetime to the QImage wrapper
+    q_img.buffer = cv_img
+    return q_img
+
+
+def to_pixmap(cv_img):
+    """Full-resolution QPixmap of an OpenCV image."""
+    return QPixmap.fromImage(to_qimage(cv_img))
+
+
+def preview_pixmap(cv_img, width, height):
+    """
+    QPixmap of cv_img fitted into width x height (aspect ratio kept).
+
+    The image is downscaled with cv2.INTER_AREA before it reaches Qt, so only
+    the small preview is ever converted to a pixmap.
+    """
+    h, w = cv_img.shape[:2]
+    scale = min(width / w, height / h)
+    if scale < 1.0:
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        cv_img = cv2.resize(cv_img, size, interpolation=cv2.INTER_AREA)
+        return to_pixmap(cv_img)
+    # Upscaling small images: let Qt do it on the (small) pixmap
+    return to_pixmap(cv_img).scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio,
+                                    Qt.TransformationMode.SmoothTransformation)
+
+
+def draw_defects(pixmap, defects, scale):
+    """
+    Paints defect boxes and class names onto a copy of a preview pixmap.
+
+    Args:
+        pixmap (QPixmap): Preview of the image the defects were found on.
+        defects (ndarray): DEFECT_DTYPE array in full-resolution image coordinates.
+        scale (float): Preview size / full-resolution size.
+    """
+    pixmap = QPixmap(pixmap)
+    painter = QPainter(pixmap)
+    box_pen = QPen(QColor(0, 255, 0), 2)
+    text_pen = QPen(QColor(0, 0, 0), 1)
+    metrics = painter.fontMetrics()
+
+    for d in defects:
+        x, y = d["x"] * scale, d["y"] * scale
+        w, h = d["w"] * scale, d["h"] * scale
+        label = DEFECT_CLASSES[d["class_id"]]
+
+        painter.setPen(box_pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawRect(QRectF(x, y, w, h))
+
+        text_w, text_h = metrics.horizontalAdvance(label) + 4, metrics.height() + 2
+        top = y - text_h if y - text_h > 0 else y + h
+        painter.setPen(text_pen)
+        painter.setBrush(QColor(255, 255, 255))
+        painter.drawRect(QRectF(x, top, text_w, text_h))
+        painter.drawText(QRectF(x + 2, top, text_w, text_h), Qt.AlignmentFlag.AlignVCenter, label)
+
+    painter.end()
+    return pixmap
@@ -1,52 +1,23 @@
 import cv2
 import os
-import numpy as np
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
-                             QLabel, QFileDialog, QGridLayout, QDialog, QScrollArea, QSizePolicy)
+                             QLabel, QFileDialog, QGridLayout, QSizePolicy, QCheckBox)
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QImage, QCursor
 from src.core.image_processor import ImageProcessor
 from src.core.database import DatabaseManager
-
-# --- 1.  FULL SCREEN VIEWER ---
-class ImageViewer(QDialog):
-    def __init__(self, cv_image, title="Image Viewer"):
-        super().__init__()
-        self.setWindowTitle(title)
-        self.resize(800, 600) # Default opening size
-        
-        layout = QVBoxLayout(self)
-        self.label = QLabel()
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        # Prepare the image
-        self.set_image(cv_image)
-        
-        # Scroll Area (To scroll if the image is too large)
-        scroll = QScrollArea()
-        scroll.setWidget(self.label)
-        scroll.setWidgetResizable(True)
-        layout.addWidget(scroll)
-
-    def set_image(self, cv_img):
-        if cv_img is None: return
-        
-        # Color conversion
-        if len(cv_img.shape) == 2:
-            rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_GRAY2RGB)
-        else:
-            rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-            
-        h, w, ch = rgb_img.shape
-        bytes_per_line = ch * w
-        q_img = QImage(rgb_img.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        self.label.setPixmap(QPixmap.fromImage(q_img))
+from src.core.batch_inspector import collect_test_images
+from src.ui.inspection_worker import InspectionWorker
+from src.ui.image_display import preview_pixmap, draw_defects
+from src.ui.tile_viewer import ImagePyramid, ImageViewer
 
 #  2.CLICKABLE LABEL 
 class ClickableImageLabel(QLabel):
     def __init__(self, title):
         super().__init__(title)
         self.original_image = None # Store the original high-resolution image
+        self.defects = None        # Optional overlay (DEFECT_DTYPE array)
+        self._previews = {}        # Scaled pixmaps by label size
+        self._pyramid = None       # Viewer tiles, built only when the viewer is opened
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setStyleSheet("""
             QLabel {
@@ -63,43 +34,64 @@ class ClickableImageLabel(QLabel):
         
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         
-    def set_cv_image(self, cv_img):
-        """Display image on screen and keep it in memory"""
+    def set_cv_image(self, cv_img, defects=None):
+        """Display image on screen and keep it in memory (defects are drawn as an overlay)"""
         self.original_image = cv_img
+        self.defects = defects
+        self._previews.clear()
+        self._pyramid = None
         if cv_img is None: return
 
-        # Prepare scaled/adapted version for display
-        if len(cv_img.shape) == 2:
-            rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_GRAY2RGB)
-        else:
-            rgb_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-            
-        h, w, ch = rgb_img.shape
-        bytes_per_line = ch * w
-        q_img = QImage(rgb_img.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_img)
-        
-        # Scale to fit label size (KeepAspectRatio)
-        self.setPixmap(pixmap.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        self.update_preview()
+
+    def update_preview(self):
+        """Shows the preview for the current label size (downscaled once per size)."""
+        size = (self.width(), self.height())
+        pixmap = self._previews.get(size)
+        if pixmap is None:
+            pixmap = preview_pixmap(self.original_image, *size)
+            if self.defects is not None and len(self.defects):
+                pixmap = draw_defects(pixmap, self.defects, pixmap.width() / self.original_image.shape[1])
+            self._previews[size] = pixmap
+            while len(self._previews) > 4:  # Only a few recent sizes (window resizing)
+                self._previews.pop(next(iter(self._previews)))
+        self.setPixmap(pixmap)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.original_image is not None:
+            self.update_preview()
 
     def mouseDoubleClickEvent(self, event):
         """This runs on double click"""
         if self.original_image is not None:
+            if self._pyramid is None:
+                self._pyramid = ImagePyramid(self.original_image)
             # Open new window
-            viewer = ImageViewer(self.original_image, self.text())
+            viewer = ImageViewer(self._pyramid, self.text(), self.defects)
             viewer.exec()
 
 class InspectionPage(QWidget):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
         
         self.processor = ImageProcessor()
-        self.db = DatabaseManager()
+        # Shared with the other pages when created by MainWindow
+        self.db = db if db is not None else DatabaseManager()
         self.ref_path = None
         self.test_path = None
+        self.pending_jobs = set()
         
         self.init_ui()
 
+        # Background worker (keeps the GUI responsive during inspection)
+        self.worker = InspectionWorker(self.processor, self.db, self)
+        self.worker.stage_changed.connect(self.on_stage_changed)
+        self.worker.job_finished.connect(self.on_job_finished)
+        self.worker.job_failed.connect(self.on_job_failed)
+        self.worker.job_cancelled.connect(self.on_job_cancelled)
+        self.worker.start()
+
     def init_ui(self):
         layout = QVBoxLayout(self)
         
@@ -108,6 +100,10 @@ class InspectionPage(QWidget):
         
         self.btn_load_ref = QPushButton("📂 Load Reference")
         self.btn_load_ref.clicked.connect(self.load_reference)
+
+        # A folder of golden samples: the best-matching one is picked per board
+        self.btn_load_ref_set = QPushButton("📂 Load Reference Set")
+        self.btn_load_ref_set.clicked.connect(self.load_reference_set)
         
         self.btn_load_test = QPushButton("📂 Load Test Image")
         self.btn_load_test.clicked.connect(self.load_test)
@@ -116,11 +112,23 @@ class InspectionPage(QWidget):
         self.btn_run.setStyleSheet("background-color: #28a745; color: white; font-weight: bold; padding: 10px;")
         self.btn_run.clicked.connect(self.run_analysis)
         self.btn_run.setEnabled(False)
+
+        self.btn_cancel = QPushButton("■ CANCEL")
+        self.btn_cancel.setStyleSheet("background-color: #dc3545; color: white; font-weight: bold; padding: 10px;")
+        self.btn_cancel.clicked.connect(self.cancel_analysis)
+        self.btn_cancel.setEnabled(False)
         
+        # Opt-in: next run under cProfile + tracemalloc (report printed to the console)
+        self.chk_profile = QCheckBox("Profile next run")
+        self.chk_profile.setStyleSheet("color: #aaa;")
+
         top_controls.addWidget(self.btn_load_ref)
+        top_controls.addWidget(self.btn_load_ref_set)
         top_controls.addWidget(self.btn_load_test)
         top_controls.addStretch()
+        top_controls.addWidget(self.chk_profile)
         top_controls.addWidget(self.btn_run)
+        top_controls.addWidget(self.btn_cancel)
         
         layout.addLayout(top_controls)
         
@@ -149,14 +157,36 @@ class InspectionPage(QWidget):
         self.status_label.setStyleSheet("color: #aaa; font-style: italic;")
         layout.addWidget(self.status_label)
 
+        # Stage timings (ms) and counters of the last inspection
+        self.metrics_label = QLabel("")
+        self.metrics_label.setStyleSheet("color: #777; font-size: 11px;")
+        layout.addWidget(self.metrics_label)
+
     def load_reference(self):
         fname, _ = QFileDialog.getOpenFileName(self, "Open Reference", "data/images", "Images (*.png *.jpg *.jpeg *.bmp)")
         if fname:
+            # Decoded once into the reference store; inspections reuse the same mapping
+            try:
+                img = self.processor.load_reference(fname)
+            except FileNotFoundError as e:
+                self.status_label.setText(str(e))
+                return
             self.ref_path = fname
-            img = cv2.imread(fname)
             self.lbl_ref.set_cv_image(img) # Using new function
             self.check_ready()
 
+    def load_reference_set(self):
+        dirname = QFileDialog.getExistingDirectory(self, "Open Reference Set", "data/images")
+        if dirname:
+            count = len(collect_test_images(dirname))
+            if count == 0:
+                self.status_label.setText(f"No reference images in {dirname}")
+                return
+            self.ref_path = dirname
+            self.lbl_ref.set_cv_image(None)
+            self.lbl_ref.setText(f"Reference set: {count} golden samples\n(best match selected per board)")
+            self.check_ready()
+
     def load_test(self):
         fname, _ = QFileDialog.getOpenFileName(self, "Open Test Image", "data/images", "Images (*.png *.jpg *.jpeg *.bmp)")
         if fname:
@@ -171,35 +201,56 @@ class InspectionPage(QWidget):
             self.status_label.setText("Status: Ready. Double click any image to enlarge.")
 
     def run_analysis(self):
-        self.status_label.setText("Status: Processing...")
-        self.status_label.repaint()
-        
-        try:
-            # 1. Load
-            img_ref = self.processor.load_image(self.ref_path)
-            img_test = self.processor.load_image(self.test_path)
-            
-            # 2. Align
-            aligned_img = self.processor.align_images(img_test, img_ref)
-            self.lbl_aligned.set_cv_image(aligned_img) # Show
-            
-            # 3. Detect Defects
-            result_img, thresh, count = self.processor.detect_defects(img_ref, aligned_img)
-            self.lbl_result.set_cv_image(result_img) # Show
-            
-            # 4. Status
-            if count == 0:
-                self.status_label.setText("✅ PASS: Perfect match.")
-                self.status_label.setStyleSheet("color: #4cd964; font-weight: bold;")
-            else:
-                self.status_label.setText(f"❌ FAIL: {count} defects detected! (Double click image to see details)")
-                self.status_label.setStyleSheet("color: #ff3b30; font-weight: bold;")
-
-            # 5. DB Log
-            if self.test_path:
-                file_name = os.path.basename(self.test_path)
-                self.db.add_log(file_name, count)
-                
-        except Exception as e:
-            self.status_label.setText(f"ERROR: {str(e)}")
-            print(e)
+        """Queues the current reference/test pair on the background worker."""
+        profile = self.chk_profile.isChecked()
+        self.chk_profile.setChecked(False)
+        job_id = self.worker.submit(self.ref_path, self.test_path, profile)
+        self.pending_jobs.add(job_id)
+        self.btn_cancel.setEnabled(True)
+
+        self.status_label.setText(f"Status: Board #{job_id} queued ({len(self.pending_jobs)} in queue)...")
+        self.status_label.setStyleSheet("color: #aaa; font-style: italic;")
+
+    def cancel_analysis(self):
+        self.worker.cancel()
+
+    def shutdown(self):
+        """Stops the background worker (called when the main window closes)."""
+        self.worker.stop()
+
+    def job_done(self, job_id):
+        self.pending_jobs.discard(job_id)
+        self.btn_cancel.setEnabled(bool(self.pending_jobs))
+
+    def on_stage_changed(self, job_id, stage):
+        self.status_label.setText(f"Status: Board #{job_id} {stage}... ({len(self.pending_jobs)} in queue)")
+
+    def on_job_finished(self, job_id, result):
+        self.job_done(job_id)
+        board = f"Board #{job_id}: {result['filename']}"
+        if "reference_image" in result:
+            # The job ran against a reference set (whatever is loaded now)
+            self.lbl_ref.set_cv_image(result["reference_image"]) # Selected golden sample
+            board += f" vs {os.path.basename(result['reference'])}"
+        self.lbl_aligned.set_cv_image(result["aligned"]) # Show
+        self.lbl_result.set_cv_image(result["aligned"], result["defects"]) # Show (boxes as overlay)
+        self.metrics_label.setText(f"Board #{job_id}: {result['metrics'].summary()}")
+        if "profile" in result:
+            print(f"[PROFILE] Board #{job_id} ({result['filename']})\n{result['profile']}")
+
+        count = result["defect_count"]
+        if count == 0:
+            self.status_label.setText(f"✅ PASS: Perfect match. ({board})")
+            self.status_label.setStyleSheet("color: #4cd964; font-weight: bold;")
+        else:
+            self.status_label.setText(f"❌ FAIL: {count} defects detected! ({board}, double click image to see details)")
+            self.status_label.setStyleSheet("color: #ff3b30; font-weight: bold;")
+
+    def on_job_failed(self, job_id, message):
+        self.job_done(job_id)
+        self.status_label.setText(f"ERROR: {message}")
+
+    def on_job_cancelled(self, job_id):
+        self.job_done(job_id)
+        self.status_label.setText(f"Status: Board #{job_id} cancelled.")
+        self.status_label.setStyleSheet("color: #aaa; font-style: italic;")
@@ -0,0 +1,155 @@
+import os
+import queue
+import itertools
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.core.metrics import InspectionMetrics, ProfileCapture
+from src.core.recipe import resolve_recipe
+from src.core.multi_reference import MultiReferenceInspector
+
+# Stages reported through stage_changed, in pipeline order
+STAGES = ("loaded", "aligned", "detected", "logged")
+
+
+class InspectionCancelled(Exception):
+    pass
+
+
+class InspectionWorker(QThread):
+    """
+    Runs inspections on a background thread so the GUI never freezes.
+
+    Jobs are queued with submit() and processed one after another, so the
+    operator can queue the next board while the current one is running.
+    Cancellation is checked between pipeline stages.
+    """
+    stage_changed = pyqtSignal(int, str)     # job_id, stage
+    job_finished = pyqtSignal(int, object)   # job_id, result dict
+    job_failed = pyqtSignal(int, str)        # job_id, error message
+    job_cancelled = pyqtSignal(int)          # job_id
+
+    def __init__(self, processor, db, parent=None):
+        super().__init__(parent)
+        self.processor = processor
+        self.db = db
+        self._jobs = queue.Queue()
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+        self._cancel_all_below = 0
+        self._selectors = {}
+
+    def submit(self, ref_path, test_path, profile=False):
+        """
+        Queues one reference/test pair and returns its job id.
+
+        ref_path may be a directory of golden samples: the best-matching one
+        is then selected automatically (see multi_reference).
+
+        With profile=True the job runs under cProfile + tracemalloc and the
+        report is returned in result["profile"] (slower; for diagnosis only).
+        """
+        job_id = next(self._ids)
+        self._jobs.put((job_id, ref_path, test_path, profile))
+        return job_id
+
+    def cancel(self, job_id=None):
+        """Cancels one job, or every queued and running job when job_id is None."""
+        if job_id is None:
+            self._cancel_all_below = next(self._ids)
+        else:
+            self._cancelled.add(job_id)
+
+    def stop(self):
+        """Cancels everything and waits for the thread to exit."""
+        self.cancel()
+        self._jobs.put(None)
+        self.wait()
+
+    def _check(self, job_id):
+        if job_id in self._cancelled or job_id < self._cancel_all_below:
+            raise InspectionCancelled()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            job_id, ref_path, test_path, profile = job
+            try:
+                if profile:
+                    with ProfileCapture() as capture:
+                        result = self._inspect(job_id, ref_path, test_path)
+                    result["profile"] = capture.report()
+                else:
+                    result = self._inspect(job_id, ref_path, test_path)
+                self.job_finished.emit(job_id, result)
+            except InspectionCancelled:
+                self.job_cancelled.emit(job_id)
+            except Exception as e:
+                self.job_failed.emit(job_id, str(e))
+            finally:
+                self._cancelled.discard(job_id)
+
+    def _selector(self, ref_dir):
+        """Multi-reference inspector for a reference directory (index kept between boards)."""
+        selector = self._selectors.get(ref_dir)
+        if selector is None:
+            selector = self._selectors[ref_dir] = MultiReferenceInspector(self.processor, ref_dir)
+        else:
+            selector.refresh()     # Picks up added / replaced golden samples; unchanged ones are not re-read
+        return selector
+
+    def _inspect(self, job_id, ref_path, test_path):
+        self._check(job_id)
+        metrics = InspectionMetrics()
+
+        selector = self._selector(ref_path) if os.path.isdir(ref_path) else None
+
+        # 1. Load
+        with metrics.stage("load"):
+            img_test = self.processor.load_image(test_path)
+            if selector is None:
+                img_ref = self.processor.load_reference(ref_path)
+        self.stage_changed.emit(job_id, "loaded")
+        self._check(job_id)
+
+        # 2. Align (reference set: pick the best-matching golden sample first)
+        if selector is not None:
+            candidates = selector.select(img_test, metrics)
+            chosen, img_ref, aligned_img = selector.warp(img_test, candidates, metrics)
+            ref_path = chosen.path
+
+        # Recipe of this reference (its .recipe.json, parsed once) or the defaults
+        processor = self.processor.with_recipe(resolve_recipe(ref_path=ref_path))
+        if selector is None:
+            aligned_img = processor.align_images(img_test, img_ref, ref_path=ref_path, metrics=metrics)
+        self.stage_changed.emit(job_id, "aligned")
+        self._check(job_id)
+
+        # 3. Detect Defects
+        defect_result = processor.find_defects(img_ref, aligned_img, metrics=metrics, ref_path=ref_path)
+        count = defect_result.count
+        self.stage_changed.emit(job_id, "detected")
+        self._check(job_id)
+
+        # 4. DB Log
+        file_name = os.path.basename(test_path)
+        with metrics.stage("db"):
+            self.db.add_log(file_name, count, defect_result.to_records(), metrics.to_dict())
+        self.stage_changed.emit(job_id, "logged")
+
+        result = {
+            "filename": file_name,
+            "reference": ref_path,
+            "aligned": aligned_img,
+            "thresh": defect_result.thresh,
+            "defect_count": count,
+            "defects": defect_result.defects,
+            "metrics": metrics,
+        }
+        if selector is not None:
+            # Golden sample picked from the reference set for this board
+            result["reference_image"] = img_ref
+        return result
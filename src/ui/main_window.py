@@ -12,15 +12,23 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QIcon
 
+import importlib
+
 # Local imports
 from src.ui.styles import MAIN_STYLE
-from src.ui.inspection_page import InspectionPage
-from src.ui.history_page import HistoryPage
-from src.ui.dashboard_page import DashboardPage
-from src.ui.quality_page import QualityPage
+from src.core.database import DatabaseManager
+
+# Stack index -> (module, class). Pages (and their matplotlib / OpenCV imports)
+# are only loaded on first navigation.
+PAGES = [
+    ("src.ui.dashboard_page", "DashboardPage"),     # Index 0
+    ("src.ui.inspection_page", "InspectionPage"),   # Index 1
+    ("src.ui.history_page", "HistoryPage"),         # Index 2
+    ("src.ui.quality_page", "QualityPage"),         # Index 3
+]
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
         self.setWindowTitle("QualiemController - Prototype")
         self.resize(1200, 800)
@@ -75,18 +83,17 @@ class MainWindow(QMainWindow):
 
         #  Content Area 
         self.content_area = QStackedWidget()
-        
-        # Initialize pages
-        self.page_dashboard = DashboardPage()
-        self.page_inspection = InspectionPage()
-        self.page_history = HistoryPage()
-        self.page_quality = QualityPage()
-        
-        # Add pages to stack
-        self.content_area.addWidget(self.page_dashboard)    # Index 0
-        self.content_area.addWidget(self.page_inspection)   # Index 1
-        self.content_area.addWidget(self.page_history)      # Index 2
-        self.content_area.addWidget(self.page_quality)      # Index 3
+
+        # One database manager for every page
+        self.db = db if db is not None else DatabaseManager()
+
+        # Placeholders; real pages are created on first navigation (see get_page)
+        self.pages = {}
+        for _ in PAGES:
+            self.content_area.addWidget(QWidget())
+
+        # Start page
+        self.get_page(0)
         
         # Add widgets to main layout
         main_layout.addWidget(self.sidebar)
@@ -107,7 +114,33 @@ class MainWindow(QMainWindow):
         btn.setCursor(Qt.CursorShape.PointingHandCursor)
         return btn
 
+    def get_page(self, index):
+        """
+        Returns (page, created): the page at index, creating it on first use.
+        """
+        page = self.pages.get(index)
+        if page is not None:
+            return page, False
+
+        module_name, class_name = PAGES[index]
+        try:
+            page_class = getattr(importlib.import_module(module_name), class_name)
+            page = page_class(self.db)
+        except ImportError as e:
+            # Missing optional dependency (e.g. matplotlib): keep the rest of the app usable
+            print(f"[UI] Could not load {class_name}: {e}")
+            page = QLabel(f"This page is unavailable: {e}")
+            page.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        placeholder = self.content_area.widget(index)
+        self.content_area.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.content_area.insertWidget(index, page)
+        self.pages[index] = page
+        return page, True
+
     def switch_page(self, index, active_btn):
+        self.get_page(index)
         self.content_area.setCurrentIndex(index)
         
         # Reset button states
@@ -120,20 +153,31 @@ class MainWindow(QMainWindow):
         active_btn.setChecked(True)
 
     def switch_to_history(self, index, active_btn):
-        if hasattr(self.page_history, 'load_data'):
-            self.page_history.load_data()
+        # A freshly created page has just loaded its data
+        page, created = self.get_page(index)
+        if not created and hasattr(page, 'load_data'):
+            page.load_data()
         self.switch_page(index, active_btn)
 
     def switch_to_dashboard(self, index, active_btn):
-        if hasattr(self.page_dashboard, 'refresh_stats'):
-            self.page_dashboard.refresh_stats()
+        page, created = self.get_page(index)
+        if not created and hasattr(page, 'refresh_stats'):
+            page.refresh_stats()
         self.switch_page(index, active_btn)
 
     def switch_to_quality(self, index, active_btn):
-        if hasattr(self.page_quality, 'refresh_chart'):
-            self.page_quality.refresh_chart()
+        page, created = self.get_page(index)
+        if not created and hasattr(page, 'refresh_chart'):
+            page.refresh_chart()
         self.switch_page(index, active_btn)
 
+    def closeEvent(self, event):
+        # Stop background inspection (if it was ever started) before the window is destroyed
+        for page in self.pages.values():
+            if hasattr(page, 'shutdown'):
+                page.shutdown()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
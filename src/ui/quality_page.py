@@ -1,19 +1,32 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QFrame, QSizePolicy, QGridLayout)
 from PyQt6.QtCore import Qt
+from collections import deque
 from src.core.database import DatabaseManager
-import numpy as np  # For statistical calculations (If missing: pip install numpy)
+from src.core.spc import RunningStats
 
 # Graphing Library
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 
 class QualityPage(QWidget):
-    def __init__(self):
+    # Number of most recent inspections shown on the trend chart
+    TREND_WINDOW = 500
+    UCL = 5
+
+    def __init__(self, db=None):
         super().__init__()
-        self.db = DatabaseManager()
-        self.chart_layout = None 
+        # Shared with the other pages when created by MainWindow
+        self.db = db if db is not None else DatabaseManager()
+        self.chart_layout = None
+
+        # Streaming state (only new rows are fetched on refresh)
+        self.stats = None
+        self.last_id = 0
+        self.trend = deque(maxlen=self.TREND_WINDOW)
+        self.hist_range = None
+        self.background = None
+
         self.init_ui()
 
     def init_ui(self):
@@ -23,7 +36,7 @@ class QualityPage(QWidget):
 
         # --- 1. HEADER AND SUMMARY CARDS ---
         top_section = QHBoxLayout()
-        
+
         # Title
         title_box = QVBoxLayout()
         header = QLabel("📈 Quality Control Center")
@@ -32,93 +45,165 @@ class QualityPage(QWidget):
         desc.setStyleSheet("color: #aaa; font-size: 13px;")
         title_box.addWidget(header)
         title_box.addWidget(desc)
-        
+
         top_section.addLayout(title_box)
         top_section.addStretch()
-        
+
         # Statistic Boxes (Mean, Max, etc.)
         self.lbl_stats = QLabel("Avg: 0 | Max: 0 | StdDev: 0.0")
         self.lbl_stats.setStyleSheet("""
-            background-color: #333; color: #4cd964; 
+            background-color: #333; color: #4cd964;
             padding: 8px; border-radius: 5px; font-weight: bold;
             border: 1px solid #555;
         """)
         top_section.addWidget(self.lbl_stats)
-        
+
         layout.addLayout(top_section)
 
         # --- 2. CHART AREA (2 Charts in Single Canvas) ---
         self.chart_frame = QFrame()
         self.chart_frame.setStyleSheet("background-color: #252526; border-radius: 10px;")
         self.chart_frame.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        
+
         self.chart_layout = QVBoxLayout(self.chart_frame)
         layout.addWidget(self.chart_frame)
 
+        # Figure and canvas are created once and updated in place
+        self.setup_chart()
+
         # Initial load
         self.refresh_chart()
 
+    def setup_chart(self):
+        # Creating a figure with 2 Rows, 1 Column
+        self.fig = Figure(figsize=(8, 8), dpi=100)
+        self.fig.patch.set_facecolor('#252526')
+        self.fig.subplots_adjust(hspace=0.4) # Space between two charts
+
+        # CHART 1: SPC Trend (Line)
+        self.ax1 = self.fig.add_subplot(211) # 2 rows, 1 col, 1st chart
+        self.ax1.set_facecolor('#1e1e1e')
+        self.trend_line, = self.ax1.plot([], [], color='#0098ff', marker='o', markersize=4, label='Defects',
+                                         animated=True)
+        self.ax1.axhline(y=self.UCL, color='#dc3545', linestyle='--', alpha=0.8, label='Upper Limit (UCL)')
+        self.ax1.set_title("Process Stability Trend (SPC)", color='white', fontsize=10)
+        self.ax1.set_ylabel("Defect Count", color='#ccc')
+        self.ax1.grid(True, color='#333', linestyle=':')
+        self.ax1.tick_params(colors='#ccc')
+        self.ax1.legend(facecolor='#252526', edgecolor='#444', labelcolor='white', fontsize=8)
+        self.trend_empty = self.ax1.text(0.5, 0.5, "Waiting for data...", ha='center', color='#666',
+                                         transform=self.ax1.transAxes)
+
+        # CHART 2: Histogram (Bar)
+        self.ax2 = self.fig.add_subplot(212) # 2 rows, 1 col, 2nd chart
+        self.bars = None
+
+        # Render Chart to Screen
+        self.canvas = FigureCanvas(self.fig)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.chart_layout.addWidget(self.canvas)
+
+    def setup_histogram(self, low, high):
+        """(Re)creates the histogram bars for defect counts low..high."""
+        self.ax2.cla()
+        self.ax2.set_facecolor('#1e1e1e')
+        self.hist_range = (low, high)
+
+        if self.stats is None or self.stats.count == 0:
+            self.bars = None
+            self.ax2.text(0.5, 0.5, "Waiting for data...", ha='center', color='#666')
+            return
+
+        values = list(range(low, high + 1))
+        self.bars = self.ax2.bar(values, [0] * len(values), width=0.8, color='#28a745', alpha=0.7)
+        for bar in self.bars:
+            bar.set_animated(True)
+        self.ax2.set_title("Defect Frequency Distribution", color='white', fontsize=10)
+        self.ax2.set_xlabel("Defect Count (Severity)", color='#ccc')
+        self.ax2.set_ylabel("Frequency", color='#ccc')
+        self.ax2.set_xticks(values) # Write integers to X axis
+        self.ax2.grid(axis='y', color='#333', linestyle=':')
+        self.ax2.tick_params(colors='#ccc')
+
+    def on_draw(self, event):
+        # Keep a copy of the static background for blitting, then draw the moving artists on top
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        self.ax1.draw_artist(self.trend_line)
+        for bar in self.bars or []:
+            self.ax2.draw_artist(bar)
+
+    def load_new_data(self):
+        """Updates running statistics and the trend window. Returns True if anything changed."""
+        if self.stats is None:
+            # First load: histogram/mean/std aggregated in SQL, only the trend window is fetched
+            distribution, self.last_id = self.db.get_defect_distribution()
+            self.stats = RunningStats.from_distribution(distribution)
+            self.trend.extend(row for row in self.db.get_recent_defects(self.TREND_WINDOW) if row[0] <= self.last_id)
+            return True
+
+        new_rows = self.db.get_defects_after(self.last_id)
+        for row_id, defect_count in new_rows:
+            self.stats.add(defect_count)
+            self.trend.append((row_id, defect_count))
+            self.last_id = row_id
+        return bool(new_rows)
+
     def refresh_chart(self):
-        """Fetches data, calculates statistics, and draws 2 charts."""
-        logs = self.db.get_all_logs()
-        logs.reverse() # Sort from old to new
-
-        ids = [row[0] for row in logs]
-        defects = [row[3] for row in logs]
-
-        # --- STATISTICS CALCULATION ---
-        if len(defects) > 0:
-            avg_defect = np.mean(defects)
-            max_defect = np.max(defects)
-            std_dev = np.std(defects)
-            stats_text = f"Average Defects: {avg_defect:.2f}  |  Max Spike: {max_defect}  |  Stability (σ): {std_dev:.2f}"
+        """Fetches only new results, updates statistics and redraws the existing charts."""
+        if not self.load_new_data() and self.background is not None:
+            return
+
+        stats = self.stats
+
+        # --- STATISTICS ---
+        if stats.count > 0:
+            stats_text = f"Average Defects: {stats.mean:.2f}  |  Max Spike: {stats.max}  |  Stability (σ): {stats.std:.2f}"
         else:
             stats_text = "No Data Available"
-        
+
         self.lbl_stats.setText(stats_text)
 
-        # --- MATPLOTLIB CHARTS ---
-        # Creating a figure with 2 Rows, 1 Column
-        fig = Figure(figsize=(8, 8), dpi=100)
-        fig.patch.set_facecolor('#252526')
-        fig.subplots_adjust(hspace=0.4) # Space between two charts
+        # --- TREND (windowed) ---
+        ids = [row[0] for row in self.trend]
+        defects = [row[1] or 0 for row in self.trend]
+        self.trend_line.set_data(ids, defects)
+        self.trend_empty.set_visible(not ids)
 
-        # CHART 1: SPC Trend (Line)
-        ax1 = fig.add_subplot(211) # 2 rows, 1 col, 1st chart
-        ax1.set_facecolor('#1e1e1e')
-        
-        if len(ids) > 0:
-            ax1.plot(ids, defects, color='#0098ff', marker='o', markersize=4, label='Defects')
-            ax1.axhline(y=5, color='#dc3545', linestyle='--', alpha=0.8, label='Upper Limit (UCL)')
-            ax1.set_title("Process Stability Trend (SPC)", color='white', fontsize=10)
-            ax1.set_ylabel("Defect Count", color='#ccc')
-            ax1.grid(True, color='#333', linestyle=':')
-            ax1.tick_params(colors='#ccc')
-            ax1.legend(facecolor='#252526', edgecolor='#444', labelcolor='white', fontsize=8)
-        else:
-            ax1.text(0.5, 0.5, "Waiting for data...", ha='center', color='#666')
+        full_redraw = self.background is None
+        if ids:
+            x_low, x_high = self.ax1.get_xlim()
+            y_low, y_high = self.ax1.get_ylim()
+            if ids[0] < x_low or ids[-1] > x_high or max(defects) > y_high or full_redraw:
+                # Leave headroom so the next results fit without rescaling (blit path)
+                span = max(ids[-1] - ids[0], 10)
+                self.ax1.set_xlim(ids[0] - 1, ids[-1] + span * 0.1)
+                self.ax1.set_ylim(-0.5, max(max(defects), self.UCL) * 1.2 + 1)
+                full_redraw = True
 
-        # CHART 2: Histogram (Bar)
-        ax2 = fig.add_subplot(212) # 2 rows, 1 col, 2nd chart
-        ax2.set_facecolor('#1e1e1e')
-
-        if len(defects) > 0:
-            # Histogram data: Distribution of defects
-            counts, bins, patches = ax2.hist(defects, bins=range(min(defects), max(defects) + 2), 
-                                             color='#28a745', alpha=0.7, rwidth=0.8, align='left')
-            ax2.set_title("Defect Frequency Distribution", color='white', fontsize=10)
-            ax2.set_xlabel("Defect Count (Severity)", color='#ccc')
-            ax2.set_ylabel("Frequency", color='#ccc')
-            ax2.set_xticks(bins[:-1]) # Write integers to X axis
-            ax2.grid(axis='y', color='#333', linestyle=':')
-            ax2.tick_params(colors='#ccc')
+        # --- HISTOGRAM ---
+        if stats.count > 0:
+            low, high = min(stats.hist), max(stats.hist)
         else:
-            ax2.text(0.5, 0.5, "Waiting for data...", ha='center', color='#666')
+            low = high = 0
+        if self.bars is None or self.hist_range != (low, high):
+            self.setup_histogram(low, high)
+            full_redraw = True
 
-        # Render Chart to Screen
-        canvas = FigureCanvas(fig)
-        
-        if self.chart_layout.count() > 0:
-            self.chart_layout.itemAt(0).widget().setParent(None)
-            
-        self.chart_layout.addWidget(canvas)
\ No newline at end of file
+        if self.bars is not None:
+            for bar, value in zip(self.bars, range(low, high + 1)):
+                bar.set_height(stats.hist.get(value, 0))
+            peak = max(stats.hist.values())
+            if peak > self.ax2.get_ylim()[1] or full_redraw:
+                self.ax2.set_ylim(0, peak * 1.2)
+                full_redraw = True
+
+        if full_redraw:
+            self.canvas.draw_idle()
+        else:
+            # Only the moving artists changed: restore background and blit them
+            self.canvas.restore_region(self.background)
+            self.draw_animated()
+            self.canvas.blit(self.fig.bbox)
@@ -0,0 +1,198 @@
+import math
+from collections import OrderedDict
+
+import cv2
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsItem,
+                             QGraphicsRectItem)
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter, QPen, QColor, QBrush, QFont, QFontMetrics
+
+from src.core.defects import DEFECT_CLASSES
+from src.ui.image_display import to_pixmap
+
+
+class ImagePyramid:
+    """
+    Lazily built image pyramid, served as tile_size x tile_size QPixmap tiles.
+
+    Level 0 is the original image (not copied); level n is half the size of
+    level n-1 and is only computed when a view that zoomed out first needs it.
+    Tile pixmaps live in an LRU cache of max_tiles entries, so memory stays
+    bounded however large the image is.
+    """
+    def __init__(self, cv_img, tile_size=512, max_tiles=256):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.levels = [cv_img]
+        self._tiles = OrderedDict()
+
+        # Coarsest level: the whole image fits into one tile
+        h, w = cv_img.shape[:2]
+        self.max_level = max(0, math.ceil(math.log2(max(w, h) / tile_size)))
+
+    @property
+    def width(self):
+        return self.levels[0].shape[1]
+
+    @property
+    def height(self):
+        return self.levels[0].shape[0]
+
+    def level(self, n):
+        while len(self.levels) <= n:
+            prev = self.levels[-1]
+            size = (max(1, prev.shape[1] // 2), max(1, prev.shape[0] // 2))
+            self.levels.append(cv2.resize(prev, size, interpolation=cv2.INTER_AREA))
+        return self.levels[n]
+
+    def level_for_scale(self, scale):
+        """Coarsest level that still has at least one image pixel per screen pixel."""
+        if scale >= 1.0:
+            return 0
+        return min(self.max_level, int(math.floor(math.log2(1.0 / scale))))
+
+    def tile(self, n, tx, ty):
+        """QPixmap of tile (tx, ty) of level n."""
+        key = (n, tx, ty)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+
+        img = self.level(n)
+        ts = self.tile_size
+        pixmap = to_pixmap(img[ty * ts:(ty + 1) * ts, tx * ts:(tx + 1) * ts])
+
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+
+class TileLayer(QGraphicsItem):
+    """Scene item that paints only the visible pyramid tiles at the current zoom."""
+    def __init__(self, pyramid):
+        super().__init__()
+        self.pyramid = pyramid
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+
+    def paint(self, painter, option, widget=None):
+        pyramid = self.pyramid
+        n = pyramid.level_for_scale(painter.worldTransform().m11())
+        img = pyramid.level(n)
+        factor = pyramid.width / img.shape[1]   # Level pixel -> scene units
+        span = pyramid.tile_size * factor
+
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        tx0, ty0 = int(exposed.left() // span), int(exposed.top() // span)
+        tx1, ty1 = int(math.ceil(exposed.right() / span)), int(math.ceil(exposed.bottom() / span))
+        tx1 = min(tx1, math.ceil(img.shape[1] / pyramid.tile_size))
+        ty1 = min(ty1, math.ceil(img.shape[0] / pyramid.tile_size))
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, n > 0)
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                pixmap = pyramid.tile(n, tx, ty)
+                target = QRectF(tx * span, ty * span, pixmap.width() * factor, pixmap.height() * factor)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+
+class DefectLabelItem(QGraphicsItem):
+    """Class name on a white box; stays the same size on screen at any zoom."""
+    def __init__(self, text, below=False):
+        super().__init__()
+        self.text = text
+        self.font = QFont()
+        self.font.setPointSize(9)
+        metrics = QFontMetrics(self.font)
+        # Above the box (anchored at its top-left corner), or below it near the image top
+        self.rect = QRectF(0, 0 if below else -20, metrics.horizontalAdvance(text) + 4, 20)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations)
+
+    def boundingRect(self):
+        return self.rect.adjusted(-1, -1, 1, 1)
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(QPen(QColor(0, 0, 0), 1))
+        painter.setBrush(QBrush(QColor(255, 255, 255)))
+        painter.drawRect(self.rect)
+        painter.setFont(self.font)
+        painter.drawText(self.rect.adjusted(2, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, self.text)
+
+
+class TileViewer(QGraphicsView):
+    """
+    Zoomable, pannable view of a (possibly huge) image with vector defect overlays.
+
+    Drag to pan, mouse wheel to zoom around the cursor.
+    """
+    ZOOM_STEP = 1.25
+
+    def __init__(self, pyramid, defects=None, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+
+        self.scene = QGraphicsScene(self)
+        self.scene.addItem(TileLayer(self.pyramid))
+        self.setScene(self.scene)
+        self.setSceneRect(0, 0, self.pyramid.width, self.pyramid.height)
+
+        if defects is not None:
+            self.add_defects(defects)
+
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setBackgroundBrush(QBrush(QColor(17, 17, 17)))
+
+    def add_defects(self, defects):
+        """Adds one box + label per row of a DEFECT_DTYPE array."""
+        # Green boxes, 2 px wide on screen at any zoom
+        pen = QPen(QColor(0, 255, 0), 2)
+        pen.setCosmetic(True)
+        for d in defects:
+            x, y, w, h = int(d["x"]), int(d["y"]), int(d["w"]), int(d["h"])
+            box = QGraphicsRectItem(x, y, w, h)
+            box.setPen(pen)
+            self.scene.addItem(box)
+
+            below = y - 20 <= 0
+            label = DefectLabelItem(DEFECT_CLASSES[d["class_id"]], below)
+            label.setPos(x, y + h if below else y)
+            self.scene.addItem(label)
+
+    def fit(self):
+        self.fitInView(self.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            factor = self.ZOOM_STEP ** steps
+            # Limit zoom: from the whole image down to 32 screen pixels per image pixel
+            scale = self.transform().m11() * factor
+            min_scale = min(self.viewport().width() / self.pyramid.width,
+                            self.viewport().height() / self.pyramid.height)
+            if min(min_scale, 1.0) * 0.5 <= scale <= 32:
+                self.scale(factor, factor)
+
+
+class ImageViewer(QDialog):
+    def __init__(self, pyramid, title="Image Viewer", defects=None):
+        super().__init__()
+        self.setWindowTitle(title)
+        self.resize(800, 600) # Default opening size
+
+        layout = QVBoxLayout(self)
+        self.view = TileViewer(pyramid, defects, self)
+        layout.addWidget(self.view)
+        self._fitted = False
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Start with the whole image in view
+        if not self._fitted:
+            self.view.fit()
+            self._fitted = True
@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+import time
+
+# Path Configuration
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(current_dir)
+
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+
+from src.core.stream_inspector import StreamInspector
+from src.core.database import DatabaseManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming inspection of a folder that cameras / AOI write images into.")
+    parser.add_argument("reference", help="Reference (golden sample) image")
+    parser.add_argument("directory", help="Directory to watch for new test images")
+    parser.add_argument("--workers", type=int, default=None, help="Inspection threads (default: CPU count - 1)")
+    parser.add_argument("--queue-size", type=int, default=32,
+                        help="Images waiting for a worker before the watcher pauses (backpressure)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Results per database write")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between directory scans")
+    parser.add_argument("--settle", type=float, default=0.5,
+                        help="Seconds a file must stay unchanged before it counts as fully written")
+    parser.add_argument("--existing", action="store_true", help="Also inspect images already in the directory")
+    parser.add_argument("--align-scale", type=float, default=1.0,
+                        help="Match features on a downscaled image (e.g. 0.25), then refine at full resolution")
+    parser.add_argument("--matcher", choices=["bf", "flann"], default="bf",
+                        help="Feature matcher: cross-checked brute force or FLANN LSH with ratio test")
+    parser.add_argument("--reuse-pose", action="store_true",
+                        help="Fixtured boards: reuse the previous homography while it still validates")
+    parser.add_argument("--recipe", default=None,
+                        help="Recipe file or name in data/recipes (default: <reference>.recipe.json or built-in)")
+    parser.add_argument("--quiet", action="store_true", help="Only show the throughput line, not every result")
+    parser.add_argument("--no-db", action="store_true", help="Do not log results to the database")
+    args = parser.parse_args()
+
+    def report(result):
+        if args.quiet:
+            return
+        if result["error"]:
+            print(f"\n{result['filename']}: ERROR {result['error']}")
+        else:
+            status = "PASS" if result["defect_count"] == 0 else "FAIL"
+            print(f"\n{result['filename']}: {status} ({result['defect_count']} defects)")
+
+    db = None if args.no_db else DatabaseManager()
+    inspector = StreamInspector(args.reference, args.directory, db=db, workers=args.workers,
+                                queue_size=args.queue_size, batch_size=args.batch_size,
+                                poll_interval=args.poll_interval, settle_time=args.settle,
+                                include_existing=args.existing,
+                                processor_options={"align_scale": args.align_scale, "matcher": args.matcher,
+                                                   "reuse_homography": args.reuse_pose},
+                                on_result=report, recipe=args.recipe)
+
+    print(f"[WATCH] Watching {args.directory} with {inspector.workers} workers, recipe '{inspector.recipe.name}' "
+          f"(Ctrl+C to stop)")
+    inspector.start()
+    try:
+        while True:
+            time.sleep(1.0)
+            meter = inspector.meter
+            print(f"\r[WATCH] {meter.rate():5.1f} img/s | done {meter.done} | failed {meter.failed} "
+                  f"| queued {inspector.queued}/{args.queue_size}   ", end="", flush=True)
+    except KeyboardInterrupt:
+        print("\n[WATCH] Stopping: finishing queued images...")
+    finally:
+        inspector.stop()
+        print(f"[WATCH] Done: {inspector.meter.done} inspected, {inspector.meter.failed} failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+import pytest
+
+from src.core.image_processor import ImageProcessor, MORPH_KERNEL, contour_points, fill_holes, measure_blobs
+
+
+def _draw(kind, rng, size=(240, 320)):
+    mask = np.zeros(size, np.uint8)
+    height, width = size
+    for _ in range(12):
+        center = (int(rng.integers(20, width - 20)), int(rng.integers(20, height - 20)))
+        if kind == "rotated":
+            box = cv2.boxPoints((center, (float(rng.uniform(3, 50)), float(rng.uniform(3, 50))),
+                                 float(rng.uniform(0, 90))))
+            cv2.fillPoly(mask, [np.round(box).astype(np.int32)], 255)
+        else:
+            axes = (int(rng.integers(2, 35)), int(rng.integers(2, 35)))
+            cv2.ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 255, -1)
+    # Same clean-up as difference_mask
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, MORPH_KERNEL)
+    return cv2.dilate(mask, MORPH_KERNEL, iterations=1)
+
+
+def _contour_areas(mask):
+    """{blob label: cv2.contourArea} from the original contour-based detection."""
+    filled = fill_holes(mask)
+    labels = cv2.connectedComponents(filled, connectivity=8)[1]
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return {int(labels[c[0, 0, 1], c[0, 0, 0]]): cv2.contourArea(c) for c in contours}
+
+
+@pytest.mark.parametrize("kind", ["rotated", "ellipse"])
+@pytest.mark.parametrize("seed", range(10))
+def test_area_matches_contour_area(kind, seed):
+    mask = _draw(kind, np.random.default_rng(seed))
+    filled = fill_holes(mask)
+    blobs = measure_blobs(filled, contour_points(filled), filled)
+    areas = np.maximum(blobs["pixel_area"] - blobs["contour_points"] / 2.0 - 1, 0)
+
+    expected = _contour_areas(mask)
+    assert len(expected) == len(areas)
+    for label, area in expected.items():
+        assert areas[label - 1] == area
+
+
+def test_area_handles_pinches_lines_and_image_border():
+    mask = np.zeros((40, 60), np.uint8)
+    cv2.rectangle(mask, (5, 5), (14, 14), 255, -1)
+    cv2.rectangle(mask, (15, 15), (24, 24), 255, -1)     # Touches the first one at a corner only
+    cv2.line(mask, (30, 2), (55, 20), 255, 1)             # One pixel wide
+    cv2.rectangle(mask, (0, 30), (20, 39), 255, -1)       # On the image border
+    mask[35, 45] = 255                                    # Single pixel
+
+    filled = fill_holes(mask)
+    blobs = measure_blobs(filled, contour_points(filled), filled)
+    areas = np.maximum(blobs["pixel_area"] - blobs["contour_points"] / 2.0 - 1, 0)
+    for label, area in _contour_areas(mask).items():
+        assert areas[label - 1] == area
+
+
+def test_defects_match_contour_loop_near_thresholds():
+    # Dark and bright blobs of every size from below min_area to past the class cutoffs
+    processor = ImageProcessor()
+    recipe = processor.recipe
+    img_ref = np.full((700, 900, 3), 128, np.uint8)
+    img_test = img_ref.copy()
+    rng = np.random.default_rng(0)
+    for row, y in enumerate(range(30, 680, 40)):
+        for col, x in enumerate(range(30, 880, 40)):
+            axes = (3 + col % 12, 3 + (row + col) % 10)
+            color = (0, 0, 0) if (row + col) % 2 else (255, 255, 255)
+            cv2.ellipse(img_test, (x, y), axes, float(rng.uniform(0, 180)), 0, 360, color, -1)
+
+    result = processor.find_defects(img_ref, img_test)
+
+    # The original per-contour loop: contourArea, mean inside the drawn contour, border check
+    gray = cv2.cvtColor(img_test, cv2.COLOR_BGR2GRAY)
+    thresh = processor.difference_mask(cv2.cvtColor(img_ref, cv2.COLOR_BGR2GRAY), gray)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    expected = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        x, y, w, h = cv2.boundingRect(contour)
+        if area > recipe.min_area:
+            mask = np.zeros_like(gray)
+            cv2.drawContours(mask, [contour], -1, 255, -1)
+            mean = cv2.mean(gray, mask=mask)[0]
+            label = processor.classify_defects(np.array([area]), np.array([mean]))[0]
+            expected.append((x, y, area, int(label)))
+
+    actual = [(int(d["x"]), int(d["y"]), float(d["area"]), int(d["class_id"])) for d in result.defects]
+    assert sorted(actual) == sorted(expected)
+
+    # The scene really exercises the cutoffs
+    areas = np.array([cv2.contourArea(c) for c in contours])
+    for cutoff in (recipe.min_area, recipe.pinhole_max_area, recipe.short_min_area):
+        assert (np.abs(areas - cutoff) < 10).any()
@@ -0,0 +1,84 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.core.image_processor import ImageProcessor
+from src.core.tiling import TiledDetector
+
+TILE_SIZES = (37, 64, 100, 256)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "images")
+
+
+def _scene(kind):
+    """Synthetic reference / test pair whose blobs cross tile seams in awkward ways."""
+    img_ref = np.full((420, 500, 3), 200, np.uint8)
+    img_test = img_ref.copy()
+    if kind == "rings":
+        # Large rings cut by many seams, with defects nested in their holes
+        cv2.circle(img_test, (180, 200), 140, (40, 40, 40), 6)
+        cv2.circle(img_test, (180, 200), 30, (90, 90, 90), -1)
+        cv2.rectangle(img_test, (150, 90), (170, 110), (60, 60, 60), -1)
+        cv2.rectangle(img_test, (330, 60), (470, 380), (30, 30, 30), 5)
+        cv2.circle(img_test, (400, 220), 12, (20, 20, 20), -1)
+    elif kind == "frame":
+        # Black warp border around the panel: everything inside is one filled blob
+        cv2.rectangle(img_test, (0, 0), (499, 419), (0, 0, 0), 8)
+        cv2.circle(img_test, (250, 210), 20, (30, 30, 30), -1)
+    elif kind == "open":
+        # A ring with a gap is not a hole; its inside blob stays a separate defect
+        cv2.ellipse(img_test, (250, 210), (150, 120), 0, 20, 340, (40, 40, 40), 6)
+        cv2.circle(img_test, (250, 210), 25, (60, 60, 60), -1)
+        # Thin diagonal strokes touching tile corners
+        cv2.line(img_test, (20, 400), (480, 20), (10, 10, 10), 3)
+    return img_ref, img_test
+
+
+def _assert_same(expected, actual):
+    order_e = np.lexsort((expected["x"], expected["y"]))
+    order_a = np.lexsort((actual["x"], actual["y"]))
+    expected, actual = expected[order_e], actual[order_a]
+    assert len(actual) == len(expected)
+    for field in ("x", "y", "w", "h", "area", "class_id"):
+        np.testing.assert_array_equal(actual[field], expected[field])
+    # Window warps may round one gray level differently from a full-frame warp
+    np.testing.assert_allclose(actual["mean_intensity"], expected["mean_intensity"], atol=1.0)
+
+
+@pytest.mark.parametrize("tile_size", TILE_SIZES)
+@pytest.mark.parametrize("kind", ["rings", "frame", "open"])
+def test_tiled_matches_untiled_synthetic(kind, tile_size):
+    processor = ImageProcessor()
+    img_ref, img_test = _scene(kind)
+    expected = processor.find_defects(img_ref, img_test).defects
+
+    tiler = TiledDetector(processor, tile_size=tile_size, workers=2)
+    actual = tiler.find_defects(img_ref, img_test, np.eye(3)).defects
+    _assert_same(expected, actual)
+
+
+def _bundled_pairs():
+    refs = sorted(glob.glob(os.path.join(DATA_DIR, "reference", "*.jpg")))
+    tests = sorted(glob.glob(os.path.join(DATA_DIR, "test", "*.jpg")))
+    return [(ref, test) for ref in refs for test in tests]
+
+
+@pytest.mark.skipif(not _bundled_pairs(), reason="bundled sample images not available")
+@pytest.mark.parametrize("tile_size", TILE_SIZES)
+def test_tiled_matches_untiled_bundled(tile_size):
+    processor = ImageProcessor()
+    tiler = TiledDetector(processor, tile_size=tile_size, workers=2)
+    for ref_path, test_path in _bundled_pairs():
+        img_ref = processor.load_image(ref_path)
+        img_test = processor.load_image(test_path)
+        h_matrix, _ = processor.estimate_homography(img_test, img_ref, ref_path)
+        if h_matrix is None:
+            continue
+        height, width = img_ref.shape[:2]
+        aligned = cv2.warpPerspective(img_test, h_matrix, (width, height))
+
+        expected = processor.find_defects(img_ref, aligned, ref_path=ref_path).defects
+        actual = tiler.find_defects(img_ref, img_test, h_matrix, ref_path=ref_path).defects
+        _assert_same(expected, actual)